@@ -53,6 +53,37 @@ ALLOWED_HOSTS = []
 MAILMAN_REST_API_URL = 'http://localhost:8001'
 MAILMAN_REST_API_USER = 'restadmin'
 MAILMAN_REST_API_PASS = 'restpass'
+# Number of idle connections to the REST API kept open by each process.
+POSTORIUS_REST_POOL_SIZE = 10
+# How bulk membership jobs (e.g. mass subscriptions) are processed: 'thread'
+# runs them in the background of the web process, 'command' leaves them to
+# the process_membership_jobs management command.
+POSTORIUS_JOB_RUNNER = 'thread'
+# How changes to Core made by saving users and templates are delivered:
+# 'thread' in the background of the web process, 'command' by the
+# dispatch_core_updates management command.
+POSTORIUS_OUTBOX_RUNNER = 'thread'
+# Domains, list settings, memberships... are cached between requests in this
+# Django cache, which must be shared by all the processes serving Postorius:
+# Postorius only forgets what it changes in that cache. The local memory
+# cache below only fits a single process, like the development server. Use
+# memcached or Redis with several workers, e.g.:
+#
+# CACHES = {
+#     'default': {...},
+#     'postorius': {
+#         'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+#         'LOCATION': '127.0.0.1:11211',
+#     },
+# }
+#
+# Nothing is cached between requests when POSTORIUS_CACHE_ALIAS is not set.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+POSTORIUS_CACHE_ALIAS = 'default'
 
 
 # Application definition
@@ -29,6 +29,31 @@ MAILMAN_REST_API_URL = 'http://localhost:9001'
 MAILMAN_REST_API_USER = 'restadmin'
 MAILMAN_REST_API_PASS = 'restpass'
 
+# VCR.py replaces the HTTP connection classes for every cassette, so the
+# connections to Core must not outlive a single REST call during tests.
+POSTORIUS_REST_POOL_SIZE = 0
+# Concurrent REST calls share the request cache, so which of them reaches
+# Core depends on timing. Make them sequential for the cassettes to replay.
+POSTORIUS_REST_CONCURRENCY = 1
+
+# The cache shared between requests is cleared before each view test, so that
+# the cassettes replay Core's state of that test only.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'postorius': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'postorius',
+    },
+}
+POSTORIUS_CACHE_ALIAS = 'postorius'
+
+# Process bulk membership jobs in the request, so that tests can check their
+# outcome right away.
+POSTORIUS_JOB_RUNNER = 'inline'
+POSTORIUS_OUTBOX_RUNNER = 'inline'
+
 
 LOGGING = {
     'version': 1,
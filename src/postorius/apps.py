@@ -23,3 +23,7 @@ from django.apps import AppConfig
 class PostoriusConfig(AppConfig):
     name = 'postorius'
     verbose_name = "Postorius"
+
+    def ready(self):
+        # Connect the signal handlers queuing the updates to Core.
+        import postorius.outbox  # noqa: F401
@@ -23,6 +23,36 @@ Authentication and authorization-related utilities.
 from allauth.account.models import EmailAddress
 from django.utils import six
 from postorius.models import Domain, List
+from postorius.utils import get_request_cache
+
+
+def get_user_list_ids(user, role):
+    """Return the ids of the lists in which a user has the given role.
+
+    Memberships are searched for all of the user's verified addresses. These
+    searches are cached, and invalidated whenever Postorius changes the roles
+    of an address. The result is also kept for the rest of the web request.
+
+    :param user: User to get the roles of.
+    :type user: django.contrib.auth.model.User
+    :param role: Membership role, like 'owner' or 'moderator'.
+    :type role: str
+    :rtype: set
+    """
+    request_cache = get_request_cache()
+    key = 'user-list-ids:{}:{}'.format(user.pk, role)
+    if request_cache is not None:
+        cached = request_cache.get(key)
+        if cached is not None:
+            return cached[1]
+    addresses = EmailAddress.objects.filter(
+        user=user, verified=True).values_list("email", flat=True)
+    list_ids = set(
+        mlist.list_id
+        for mlist in List.objects.find_by_subscriber(addresses, role))
+    if request_cache is not None:
+        request_cache.set(key, None, list_ids)
+    return list_ids
 
 
 def user_is_in_list_roster(user, mailing_list, roster):
@@ -37,14 +67,9 @@ def user_is_in_list_roster(user, mailing_list, roster):
     """
     if not user.is_authenticated:
         return False
-    addresses = set(EmailAddress.objects.filter(
-        user=user, verified=True).values_list("email", flat=True))
-    roster_addresses = set(
-        [member.email for member in getattr(mailing_list, roster)]
-    )
-    if addresses & roster_addresses:
-        return True  # At least one address is in the roster
-    return False
+    # Rosters are named after the plural of the role.
+    role = roster[:-1]
+    return mailing_list.list_id in get_user_list_ids(user, role)
 
 
 def set_list_access_props(user, mlist):
@@ -73,15 +98,11 @@ def set_domain_access_props(user, domain):
     :param domain: Domain to check permissions for.
     :type domain: postorius.models.Domain
     """
-    # TODO: This is very slow as it involves first iterating over every domain
-    # owner and then each of their addresses. Create an API in Core to
-    # facilitate this.
-    if isinstance(domain, six.string_types):
-        domain = Domain.objects.get_or_404(domain)
-    owner_addresses = []
-    for owner in domain.owners:
-        owner_addresses.extend(owner.addresses)
-    owner_addresses = set([each.email for each in owner_addresses])
+    if not isinstance(domain, six.string_types):
+        domain = domain.mail_host
+    # Walking through every owner's addresses is slow, but the result is
+    # cached.
+    owner_addresses = Domain.objects.get_owner_addresses(domain)
     user_addresses = set(EmailAddress.objects.filter(
         user=user, verified=True).values_list("email", flat=True))
     user.is_domain_owner = owner_addresses & user_addresses
@@ -22,9 +22,9 @@ from django import forms
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext_lazy as _
-from django_mailman3.lib.mailman import get_mailman_client
 
 from postorius.forms.fields import ListOfStringsField
+from postorius.utils import VIEWS_API_VERSION, get_mailman_client
 
 
 ACTION_CHOICES = (
@@ -518,8 +518,9 @@ class AlterMessagesForm(ListSettingsForm):
         label=_('Pipeline'),
         widget=forms.Select(),
         required=False,
-        choices=lambda: ((p, p) for p in get_mailman_client()
-                         .pipelines['pipelines']),
+        choices=lambda: (
+            (p, p) for p in get_mailman_client(VIEWS_API_VERSION)
+            .pipelines['pipelines']),
         help_text=_('Type of pipeline you want to use for this mailing list'))
 
 
@@ -767,6 +768,24 @@ class ListHeaderMatchFormset(forms.BaseFormSet):
             orders.append(order)
 
 
+class HeldMessagesFilterForm(forms.Form):
+    """Filter the held messages of a list.
+
+    Every field matches the part of the held messages' attribute of the same
+    name, case-insensitively.
+    """
+    sender = forms.CharField(label=_('Sender'), required=False)
+    subject = forms.CharField(label=_('Subject'), required=False)
+    reason = forms.CharField(label=_('Reason'), required=False)
+
+    def get_filters(self):
+        """Return the filters that were filled in, as a dict."""
+        if not self.is_valid():
+            return {}
+        return dict((key, value) for key, value in self.cleaned_data.items()
+                    if value)
+
+
 class MemberModeration(forms.Form):
     """
     Form handling the member's moderation_action.
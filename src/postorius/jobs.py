@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Processing of bulk membership jobs.
+
+A `MembershipJob` stores one `MembershipJobResult` per address. Jobs acting
+on the current members first collect their addresses, one page of the roster
+at a time, keeping the next page in the job's cursor. Addresses are then
+processed in batches: the addresses of a batch are sent to Core concurrently
+and their outcome is saved before the next batch starts, so that the progress
+can be followed from the job page and an interrupted job can be resumed where
+it stopped.
+
+How jobs are started is controlled by the ``POSTORIUS_JOB_RUNNER`` setting:
+
+``'thread'`` (default)
+    in a background thread of the web process, once the job is committed.
+``'command'``
+    by a separate worker running the ``process_membership_jobs`` management
+    command.
+``'inline'``
+    synchronously, in the request that created the job.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals)
+
+import email.utils
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.six.moves.urllib.error import HTTPError
+from django.utils.translation import ugettext as _
+
+from postorius.models import (
+    List, Member, MembershipJob, MembershipJobResult)
+from postorius.utils import concurrent_map, get_error_message
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_RUNNER = 'thread'
+DEFAULT_JOB_BATCH_SIZE = 50
+# The longest address that can be delivered to, per RFC 5321.
+MAX_ADDRESS_LENGTH = 254
+# Time after which a running job which made no progress is considered
+# interrupted, e.g. because its worker was killed, and can be resumed.
+STALE_JOB_TIMEOUT = 600
+
+
+def _subscribe(mailing_list, result):
+    mailing_list.subscribe(address=result.address,
+                           display_name=result.display_name,
+                           pre_verified=True,
+                           pre_confirmed=True,
+                           pre_approved=True)
+    return _('The address %(address)s has been subscribed to %(list)s.') % {
+        'address': result.address, 'list': mailing_list.fqdn_listname}
+
+
+def _unsubscribe(mailing_list, result):
+    mailing_list.unsubscribe(result.address)
+    return _('The address %(address)s has been unsubscribed from'
+             ' %(list)s.') % {'address': result.address,
+                              'list': mailing_list.fqdn_listname}
+
+
+def _collect_members(job, mailing_list, page_size):
+    while job.cursor is not None:
+        page = mailing_list.get_member_page(count=page_size, page=job.cursor)
+        addresses = [member.email for member in page]
+        with transaction.atomic():
+            # Members added meanwhile can shift the pages, don't collect an
+            # address twice.
+            known = set(job.results.filter(
+                address__in=addresses).values_list('address', flat=True))
+            MembershipJobResult.objects.bulk_create([
+                MembershipJobResult(job=job, address=address)
+                for address in addresses if address not in known])
+            if page.has_next:
+                job.cursor += 1
+            else:
+                job.cursor = None
+                job.total = job.results.count()
+            job.save(update_fields=['cursor', 'total', 'updated_at'])
+
+
+# The function processing a single address, for each job action. It returns
+# the message to record on success and raises HTTPError or ValueError when
+# Core refuses the change.
+ACTION_HANDLERS = {
+    MembershipJob.SUBSCRIBE: _subscribe,
+    MembershipJob.UNSUBSCRIBE_ALL: _unsubscribe,
+}
+
+# The function collecting the addresses to process, for the actions which
+# don't know them when the job is created.
+ACTION_COLLECTORS = {
+    MembershipJob.UNSUBSCRIBE_ALL: _collect_members,
+}
+
+
+def create_subscribe_job(mailing_list, entries, user=None):
+    """Record a job subscribing addresses to a list.
+
+    Entries that aren't valid email addresses are recorded as failed right
+    away.
+
+    :param mailing_list: The list to subscribe the addresses to.
+    :type mailing_list: mailmanclient.MailingList
+    :param entries: Addresses, optionally with a display name, like
+        ``Jane Doe <jane@example.com>``.
+    :type entries: list of str
+    :param user: The user requesting the subscriptions.
+    :type user: django.contrib.auth.models.User
+    :return: The new job.
+    :rtype: postorius.models.MembershipJob
+    """
+    results = []
+    for entry in entries:
+        # Parse the data to get the address and the display name
+        display_name, address = email.utils.parseaddr(entry)
+        result = MembershipJobResult(address=address,
+                                     display_name=display_name[:255])
+        try:
+            validate_email(address)
+            if len(address) > MAX_ADDRESS_LENGTH:
+                raise ValidationError('Too long.')
+        except ValidationError:
+            # Keep the entry as it was typed, as far as it fits.
+            result.address = (address or entry)[:255]
+            result.status = MembershipJobResult.ERROR
+            result.message = _('The email address %s is not valid.') % (
+                address or entry)
+        results.append(result)
+    return _create_job(mailing_list.list_id, MembershipJob.SUBSCRIBE,
+                       results, user)
+
+
+def create_unsubscribe_all_job(mailing_list, user=None):
+    """Record a job unsubscribing all the members of a list.
+
+    :param mailing_list: The list to empty.
+    :type mailing_list: mailmanclient.MailingList
+    :param user: The user requesting the removal.
+    :type user: django.contrib.auth.models.User
+    :return: The new job.
+    :rtype: postorius.models.MembershipJob
+    """
+    total = mailing_list.get_member_page(count=1, page=1).total_size
+    return _create_job(mailing_list.list_id, MembershipJob.UNSUBSCRIBE_ALL,
+                       [], user, total=total, cursor=1)
+
+
+def _create_job(list_id, action, results, user=None, **kwargs):
+    kwargs.setdefault('total', len(results))
+    with transaction.atomic():
+        job = MembershipJob.objects.create(
+            list_id=list_id, action=action,
+            created_by=user if user and user.is_authenticated else None,
+            processed=len([r for r in results
+                           if r.status != MembershipJobResult.PENDING]),
+            **kwargs)
+        for result in results:
+            result.job = job
+        MembershipJobResult.objects.bulk_create(results)
+    return job
+
+
+def schedule_job(job):
+    """Start processing a job according to ``POSTORIUS_JOB_RUNNER``."""
+    runner = getattr(settings, 'POSTORIUS_JOB_RUNNER', DEFAULT_JOB_RUNNER)
+    if runner == 'inline':
+        run_job(job.pk)
+    elif runner == 'thread':
+        transaction.on_commit(lambda: _start_thread(job.pk))
+    elif runner != 'command':
+        raise ValueError('Unknown POSTORIUS_JOB_RUNNER: {}'.format(runner))
+
+
+def _start_thread(job_id):
+    def target():
+        try:
+            run_job(job_id)
+        except Exception:
+            logger.exception('Membership job %s crashed.', job_id)
+        finally:
+            # Threads don't go through the request cycle, close their
+            # database connection ourselves.
+            connection.close()
+    thread = threading.Thread(
+        target=target, name='postorius-job-{}'.format(job_id))
+    thread.daemon = True
+    thread.start()
+
+
+def get_claimable_jobs(resume=False):
+    """Return the jobs a worker can start.
+
+    :param resume: Also return the jobs that failed, and the running jobs
+        which made no progress for ``STALE_JOB_TIMEOUT`` seconds, to resume
+        jobs that were interrupted.
+    :rtype: django.db.models.QuerySet
+    """
+    claimable = Q(status=MembershipJob.PENDING)
+    if resume:
+        stale = timezone.now() - timedelta(seconds=STALE_JOB_TIMEOUT)
+        claimable |= Q(status=MembershipJob.FAILED)
+        claimable |= Q(status=MembershipJob.RUNNING, updated_at__lt=stale)
+    return MembershipJob.objects.filter(claimable)
+
+
+def claim_job(job_id, resume=False):
+    """Mark a job as running, unless another worker already did.
+
+    :param resume: Also claim interrupted jobs, see `get_claimable_jobs`.
+    :return: Whether the job was claimed.
+    :rtype: bool
+    """
+    return get_claimable_jobs(resume).filter(pk=job_id).update(
+        status=MembershipJob.RUNNING, error='',
+        updated_at=timezone.now()) == 1
+
+
+def run_job(job_id, resume=False):
+    """Process the pending addresses of a job, batch by batch.
+
+    :param job_id: The primary key of the job.
+    :param resume: Resume a job that was interrupted, see `claim_job`.
+    :return: The job, or None if it was claimed by another worker.
+    :rtype: postorius.models.MembershipJob
+    """
+    if not claim_job(job_id, resume):
+        return None
+    job = MembershipJob.objects.get(pk=job_id)
+    handler = ACTION_HANDLERS[job.action]
+    collect = ACTION_COLLECTORS.get(job.action)
+    batch_size = getattr(settings, 'POSTORIUS_JOB_BATCH_SIZE',
+                         DEFAULT_JOB_BATCH_SIZE)
+    try:
+        mailing_list = List.objects.get(fqdn_listname=job.list_id)
+        if collect is not None:
+            collect(job, mailing_list, batch_size)
+        while True:
+            batch = list(job.results.filter(
+                status=MembershipJobResult.PENDING)[:batch_size])
+            if not batch:
+                break
+            outcomes = concurrent_map(
+                lambda result: handler(mailing_list, result), batch,
+                return_exceptions=True)
+            _record_batch(job, batch, outcomes)
+    except Exception as e:
+        logger.exception('Membership job %s failed.', job.pk)
+        job.status = MembershipJob.FAILED
+        job.error = str(e)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        return job
+    job.status = MembershipJob.DONE
+    job.save(update_fields=['status', 'updated_at'])
+    return job
+
+
+def _record_batch(job, batch, outcomes):
+    """Save the outcome of a batch.
+
+    HTTP errors and ValueErrors are specific to an address and recorded on
+    it. Any other error (e.g. Core being unreachable) is raised after the
+    rest of the batch has been saved, the addresses it concerns stay
+    pending.
+    """
+    failure = None
+    done = []
+    with transaction.atomic():
+        for result, outcome in zip(batch, outcomes):
+            if isinstance(outcome, (HTTPError, ValueError)):
+                result.status = MembershipJobResult.ERROR
+                result.message = get_error_message(outcome)
+            elif isinstance(outcome, Exception):
+                failure = failure or outcome
+                continue
+            else:
+                result.status = MembershipJobResult.SUCCESS
+                result.message = outcome or ''
+            result.save(update_fields=['status', 'message'])
+            done.append(result)
+        job.processed += len(done)
+        job.save(update_fields=['processed', 'updated_at'])
+    Member.objects.invalidate_cache(*[result.address for result in done])
+    if failure is not None:
+        raise failure
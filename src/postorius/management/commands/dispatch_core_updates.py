@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from postorius.outbox import dispatch_all, get_backlog
+
+
+class Command(BaseCommand):
+
+    help = '''Deliver the pending updates to Mailman Core, like the creation
+              of Mailman users and template changes, and retry the failed
+              ones. Use this with POSTORIUS_OUTBOX_RUNNER = 'command', e.g.
+              from cron or with --loop.
+            '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep waiting for new updates instead of exiting.')
+        parser.add_argument(
+            '--interval', type=int, default=5,
+            help='Seconds to wait between checks for updates with --loop.')
+        parser.add_argument(
+            '--status', action='store_true',
+            help='Only show the size of the backlog.')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.stdout.write(
+                'pending={pending} failing={failing} '
+                'oldest_age={oldest_age}'.format(**get_backlog()))
+            return
+        while True:
+            dispatch_all()
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import io
+import json
+import tarfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from postorius.models import EmailTemplate
+
+
+def template_path(template):
+    """Return the path of a template in a tarball.
+
+    Templates are stored as <context>/<identifier>/<name>.txt, or
+    <name>.<language>.txt when they have a language.
+    """
+    filename = template['name']
+    if template['language']:
+        filename += '.' + template['language']
+    return '{}/{}/{}.txt'.format(
+        template['context'], template['identifier'], filename)
+
+
+class Command(BaseCommand):
+
+    help = '''Export the email templates of lists and domains, as JSON or as
+              a tarball with a file per template. The output can be imported
+              with import_templates.
+            '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', nargs='?', default='-',
+            help='The file to write, the standard output by default.')
+        parser.add_argument(
+            '--format', choices=('json', 'tar'), default=None,
+            help='The output format. Defaults to tar for files ending in '
+                 '.tar, .tar.gz or .tgz and to JSON otherwise.')
+        parser.add_argument(
+            '--context', choices=('list', 'domain'),
+            help='Only export the templates of lists or of domains.')
+        parser.add_argument(
+            '--identifier', action='append', default=[],
+            help='Only export the templates of this list id or domain. Can '
+                 'be given several times.')
+
+    def handle(self, *args, **options):
+        templates = EmailTemplate.objects.order_by(
+            'context', 'identifier', 'name', 'language')
+        if options['context']:
+            templates = templates.filter(context=options['context'])
+        if options['identifier']:
+            templates = templates.filter(
+                identifier__in=options['identifier'])
+        templates = list(templates.values(
+            'context', 'identifier', 'name', 'language', 'data'))
+        output = options['output']
+        fmt = options['format'] or (
+            'tar' if output.endswith(('.tar', '.tar.gz', '.tgz')) else 'json')
+        if fmt == 'json':
+            content = json.dumps(templates, indent=2, sort_keys=True)
+            if output == '-':
+                self.stdout.write(content)
+            else:
+                with open(output, 'w', encoding='utf-8') as f:
+                    f.write(content)
+        else:
+            if output == '-':
+                raise CommandError('Tarballs must be written to a file.')
+            mode = 'w:gz' if output.endswith(('.gz', '.tgz')) else 'w'
+            with tarfile.open(output, mode) as tar:
+                for template in templates:
+                    data = template['data'].encode('utf-8')
+                    info = tarfile.TarInfo(template_path(template))
+                    info.size = len(data)
+                    tar.addfile(info, io.BytesIO(data))
+        self.stderr.write('Exported {} templates.'.format(len(templates)))
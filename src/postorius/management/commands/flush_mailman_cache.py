@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from django.core.management.base import BaseCommand, CommandError
+
+from postorius.models import mailman_cache
+
+
+# The site-wide scopes of the cache, which are rarely changed and only
+# expire after their timeout when they are changed outside of Postorius.
+SITE_SCOPES = ('system', 'domains', 'styles')
+
+
+class Command(BaseCommand):
+
+    help = '''Forget the cached system preferences, domains and list styles,
+              e.g. after changing them directly in Mailman Core.
+            '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scopes', nargs='*',
+            help='The scopes to flush among {}, all of them by '
+                 'default.'.format(', '.join(SITE_SCOPES)))
+
+    def handle(self, *args, **options):
+        unknown = set(options['scopes']) - set(SITE_SCOPES)
+        if unknown:
+            raise CommandError(
+                'Unknown scopes: {}'.format(', '.join(sorted(unknown))))
+        for scope in options['scopes'] or SITE_SCOPES:
+            mailman_cache.invalidate(scope)
+            self.stdout.write('Flushed the {} cache.'.format(scope))
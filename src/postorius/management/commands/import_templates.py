@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import tarfile
+from collections import OrderedDict
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from postorius import outbox
+from postorius.models import Domain, EmailTemplate, List
+from postorius.template_list import TEMPLATES_LIST
+
+
+# The identifier applying a template to every list or domain.
+ALL = '*'
+UPDATE_BATCH_SIZE = 500
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_tar(path):
+    """Read a tarball written by the export_templates command."""
+    templates = []
+    with tarfile.open(path) as tar:
+        for member in tar.getmembers():
+            if not member.isfile() or not member.name.endswith('.txt'):
+                continue
+            try:
+                context, identifier, filename = member.name.split('/')
+            except ValueError:
+                raise CommandError(
+                    'Unexpected file in the tarball: {}'.format(member.name))
+            name, _, language = filename[:-len('.txt')].partition('.')
+            templates.append(dict(
+                context=context, identifier=identifier, name=name,
+                language=language,
+                data=tar.extractfile(member).read().decode('utf-8')))
+    return templates
+
+
+class Command(BaseCommand):
+
+    help = '''Create or update email templates of lists and domains in bulk,
+              from a file written by export_templates, and set them in
+              Mailman Core. Use "*" as the identifier of a template to apply
+              it to every list or every domain.
+            '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='The JSON file or tarball to read.')
+        parser.add_argument(
+            '--domain',
+            help='Only apply the templates of the "*" lists to the lists of '
+                 'this domain.')
+
+    def handle(self, *args, **options):
+        path = options['input']
+        if path.endswith(('.tar', '.tar.gz', '.tgz')):
+            entries = read_tar(path)
+        else:
+            entries = read_json(path)
+        templates = self._expand(self._validate(entries), options['domain'])
+        with transaction.atomic():
+            created, updated = self._save(templates)
+            for template in created + updated:
+                transaction.on_commit(partial(
+                    EmailTemplate.objects.forget_served, template))
+                outbox.enqueue_template(template, schedule=False)
+        self.stdout.write('Created {} and updated {} templates, {} were '
+                          'unchanged.'.format(
+                              len(created), len(updated),
+                              len(templates) - len(created) - len(updated)))
+        # Deliver the changes to Core by concurrent batches, failures are
+        # retried by the dispatcher.
+        outbox.dispatch_all()
+        backlog = outbox.get_backlog()
+        if backlog['pending']:
+            self.stderr.write(
+                '{} updates to Core are pending, they are retried by '
+                'dispatch_core_updates.'.format(backlog['pending']))
+
+    def _validate(self, entries):
+        names = dict(TEMPLATES_LIST)
+        for entry in entries:
+            if entry.get('context') not in ('list', 'domain'):
+                raise CommandError(
+                    'Invalid context for template: {}'.format(entry))
+            if entry.get('name') not in names:
+                raise CommandError(
+                    'Invalid template name: {}'.format(entry.get('name')))
+            if not entry.get('identifier'):
+                raise CommandError(
+                    'Missing identifier for template: {}'.format(entry))
+            entry.setdefault('language', '')
+            if 'data' not in entry:
+                raise CommandError(
+                    'Missing data for template: {}'.format(entry))
+        return entries
+
+    def _expand(self, entries, mail_host=None):
+        identifiers = {}
+
+        def get_all(context):
+            if context not in identifiers:
+                if context == 'domain':
+                    identifiers[context] = [
+                        domain.mail_host for domain in Domain.objects.all()]
+                elif mail_host:
+                    identifiers[context] = [
+                        mlist.list_id
+                        for mlist in List.objects.by_mail_host(mail_host)]
+                else:
+                    identifiers[context] = [
+                        mlist.list_id for mlist in List.objects.all()]
+            return identifiers[context]
+
+        # The last entry for a template wins.
+        templates = OrderedDict()
+        for entry in entries:
+            if entry['identifier'] == ALL:
+                entry_identifiers = get_all(entry['context'])
+            else:
+                entry_identifiers = [entry['identifier']]
+            for identifier in entry_identifiers:
+                key = (entry['context'], identifier, entry['name'],
+                       entry['language'])
+                templates[key] = entry['data']
+        return templates
+
+    def _save(self, templates):
+        names = set(name for context, identifier, name, language in templates)
+        existing = dict(
+            ((t.context, t.identifier, t.name, t.language), t)
+            for t in EmailTemplate.objects.filter(name__in=names))
+        created = []
+        changed = {}
+        for key, data in templates.items():
+            template = existing.get(key)
+            if template is None:
+                context, identifier, name, language = key
+                created.append(EmailTemplate(
+                    context=context, identifier=identifier, name=name,
+                    language=language, data=data))
+            elif template.data != data:
+                template.data = data
+                changed.setdefault(data, []).append(template)
+        EmailTemplate.objects.bulk_create(
+            created, batch_size=UPDATE_BATCH_SIZE)
+        # A template rolled out to many lists has the same data everywhere,
+        # update the rows sharing their new data together.
+        now = timezone.now()
+        for data, changed_templates in changed.items():
+            pks = [template.pk for template in changed_templates]
+            for start in range(0, len(pks), UPDATE_BATCH_SIZE):
+                EmailTemplate.objects.filter(
+                    pk__in=pks[start:start + UPDATE_BATCH_SIZE]).update(
+                        data=data, modified_at=now)
+        updated = [template for changed_templates in changed.values()
+                   for template in changed_templates]
+        return created, updated
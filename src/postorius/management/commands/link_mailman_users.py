@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from postorius.models import Mailman404Error, MailmanUser
+from postorius.utils import concurrent_map, get_error_message
+
+
+class Command(BaseCommand):
+
+    help = '''Link the Django users to their Mailman user, so that it doesn't
+              have to be looked up by email address on their next request.
+              Users that are already linked are skipped.
+            '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--create', action='store_true',
+            help='Create the Mailman users which do not exist yet.')
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of users to look up before saving their links.')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(
+            mailman_user_link__isnull=True).exclude(email='').order_by('pk')
+        create = options['create']
+
+        def lookup(user):
+            try:
+                return MailmanUser.objects.get(address=user.email)
+            except Mailman404Error:
+                if create:
+                    return MailmanUser.objects.create_from_django(user)
+                return None
+
+        linked = missing = failed = 0
+        last_pk = 0
+        while True:
+            batch = list(users.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            outcomes = concurrent_map(lookup, batch, return_exceptions=True)
+            for user, outcome in zip(batch, outcomes):
+                if isinstance(outcome, Exception):
+                    failed += 1
+                    self.stderr.write('Could not link {}: {}'.format(
+                        user.username, get_error_message(outcome)))
+                elif outcome is None:
+                    missing += 1
+                else:
+                    # The user may have been linked meanwhile by one of their
+                    # requests, update the link then.
+                    MailmanUser.objects.link_django_user(user, outcome)
+                    linked += 1
+        self.stdout.write(self.style.SUCCESS(
+            'Linked {} users, {} have no Mailman user.'.format(
+                linked, missing)))
+        if failed:
+            self.stderr.write(self.style.ERROR(
+                '{} users could not be linked, run the command again to '
+                'retry them.'.format(failed)))
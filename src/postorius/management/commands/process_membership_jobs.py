@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from postorius.jobs import get_claimable_jobs, run_job
+from postorius.models import MembershipJob
+
+
+class Command(BaseCommand):
+
+    help = '''Process the pending bulk membership jobs, like mass
+              subscriptions. Use this with POSTORIUS_JOB_RUNNER = 'command',
+              e.g. from cron or with --loop.
+            '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Also resume the jobs that failed, or that were interrupted '
+                 'while running.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep waiting for new jobs instead of exiting.')
+        parser.add_argument(
+            '--interval', type=int, default=5,
+            help='Seconds to wait between checks for new jobs with --loop.')
+
+    def handle(self, *args, **options):
+        resume = options['resume']
+        while True:
+            self._process(resume)
+            if not options['loop']:
+                break
+            # Only resume interrupted jobs once, on start.
+            resume = False
+            time.sleep(options['interval'])
+
+    def _process(self, resume):
+        job_ids = get_claimable_jobs(resume).order_by(
+            'created_at').values_list('pk', flat=True)
+        for job_id in job_ids:
+            job = run_job(job_id, resume=resume)
+            if job is None:
+                continue
+            msg = '{}: {}/{} addresses processed'.format(
+                job, job.processed, job.total)
+            if job.status == MembershipJob.DONE:
+                self.stdout.write(self.style.SUCCESS(msg))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    '{} ({})'.format(msg, job.error)))
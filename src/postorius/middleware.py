@@ -36,7 +36,16 @@ class PostoriusMiddleware(object):
         self.get_response = get_response
 
     def __call__(self, request):
-        return self.get_response(request)
+        # Remember the REST responses while handling this request, so that
+        # resources used by several views, templates and helpers are only
+        # fetched from Core once.
+        request.mailman_cache = utils.begin_request_cache()
+        try:
+            return self.get_response(request)
+        finally:
+            cache = utils.end_request_cache()
+            logger.debug('%s: %d REST cache hits, %d misses',
+                         request.path, cache.hits, cache.misses)
 
     def process_exception(self, request, exception):
         if isinstance(exception, (MailmanApiError, MailmanConnectionError)):
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.20 on 2019-04-03 08:41
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+# flake8: noqa
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('postorius', '0008_membershipjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membershipjob',
+            name='cursor',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='membershipjob',
+            name='action',
+            field=models.CharField(choices=[('subscribe', 'Subscribe'), ('unsubscribe_all', 'Unsubscribe all members')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.20 on 2019-04-08 09:27
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+# flake8: noqa
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('postorius', '0010_mailmanuserlink'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoreUpdate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('action', models.CharField(choices=[('create_user', 'Create the Mailman user'), ('set_template', 'Set or remove a template')], max_length=30)),
+                ('payload', models.TextField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(db_index=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ('next_attempt_at', 'pk'),
+            },
+        ),
+    ]
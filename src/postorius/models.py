@@ -19,39 +19,36 @@
 from __future__ import (
     absolute_import, division, print_function, unicode_literals)
 
+import hashlib
 import logging
-from urllib.parse import urljoin
+import re
+import time
+from collections import namedtuple
+from email import message_from_string, policy
+from urllib.parse import urlencode, urljoin
 
 from django.conf import settings
+from django.core.cache import caches
 from django.core.exceptions import ImproperlyConfigured
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models.signals import post_save, post_delete
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.http import Http404
 from django.urls import reverse
 from django.utils.six.moves.urllib.error import HTTPError
 from django.utils.translation import ugettext_lazy as _
+from django_mailman3.models import MailDomain
 from mailmanclient import MailmanConnectionError
 
-from postorius.utils import get_mailman_client, LANGUAGES
+from postorius.utils import (
+    concurrent_map, get_error_message, get_mailman_client, LANGUAGES,
+    MailmanConnection)
 from postorius.template_list import TEMPLATES_LIST
 
 logger = logging.getLogger(__name__)
 
 
-@receiver(post_save, sender=User)
-def create_mailman_user(sender, **kwargs):
-    if kwargs.get('created'):
-        if getattr(settings, 'AUTOCREATE_MAILMAN_USER', False):
-            user = kwargs.get('instance')
-            try:
-                MailmanUser.objects.create_from_django(user)
-            except (MailmanApiError, HTTPError):
-                logger.error('Mailman user not created for {}'.format(user))
-                logger.error('Mailman Core API is not reachable.')
-
-
 class MailmanApiError(Exception):
     """Raised if the API is not available.
     """
@@ -63,6 +60,164 @@ class Mailman404Error(Exception):
     pass
 
 
+def _list_scope(list_identifier):
+    # Lists are addressed both by their fqdn_listname and their list_id.
+    return 'list:' + list_identifier.replace('@', '.')
+
+
+def _domain_scope(mail_host):
+    return 'domain:{}'.format(mail_host.lower())
+
+
+def _requests_scope(list_identifier):
+    return 'requests:' + list_identifier.replace('@', '.')
+
+
+def _held_scope(list_identifier):
+    return 'held:' + list_identifier.replace('@', '.')
+
+
+def _address_scope(address):
+    # mailmanclient searches the memberships of an Address object, which is
+    # converted to its email.
+    return 'address:' + str(address).lower()
+
+
+class MailmanCache(object):
+    """Cache of rarely changing Core data shared between requests.
+
+    It is backed by the Django cache named in ``POSTORIUS_CACHE_ALIAS``.
+    Postorius invalidates the entries it changes in that cache only, so it
+    must be shared by all the processes serving Postorius, like memcached or
+    Redis. Nothing is cached when the setting is not set. Every kind of data
+    has its own timeout in seconds, which can be overridden in the
+    ``POSTORIUS_CACHE_TIMEOUTS`` dict; a timeout of 0 disables it.
+
+    Entries belong to a scope, like a single mailing list. Invalidating a
+    scope moves it to a new generation, which makes all of its entries
+    unreachable at once.
+    """
+
+    timeouts = {
+        'domains': 300,
+        'styles': 3600,
+        'list_settings': 60,
+        'list_archivers': 300,
+        'memberships': 60,
+        'domain_owners': 300,
+        'domain_sites': 300,
+        'domain_list_counts': 60,
+        'held_messages': 300,
+        'held_previews': 3600,
+        'held_searches': 60,
+        'pending_requests': 60,
+        'system_preferences': 3600,
+        'template_data': 3600,
+    }
+
+    # REST resources served from this cache: kind, path regex and a function
+    # returning the scope from the regex match and the request data.
+    resources = (
+        ('domains', re.compile(r'^domains(/[^/?]+)?(\?.*)?$'),
+         lambda match, data: 'domains'),
+        ('styles', re.compile(r'^lists/styles$'),
+         lambda match, data: 'styles'),
+        ('system_preferences', re.compile(r'^system/preferences$'),
+         lambda match, data: 'system'),
+        ('list_settings', re.compile(r'^lists/(?P<list>[^/?]+)/config$'),
+         lambda match, data: _list_scope(match.group('list'))),
+        ('list_archivers',
+         re.compile(r'^lists/(?P<list>[^/?]+)/archivers$'),
+         lambda match, data: _list_scope(match.group('list'))),
+        # Only searches by subscriber, which are invalidated per address.
+        ('memberships', re.compile(r'^(lists|members)/find$'),
+         lambda match, data: (data or {}).get('subscriber') and
+         _address_scope(data['subscriber'])),
+    )
+
+    @property
+    def cache(self):
+        alias = getattr(settings, 'POSTORIUS_CACHE_ALIAS', None)
+        return caches[alias] if alias else None
+
+    def get_timeout(self, kind):
+        if self.cache is None:
+            return 0
+        timeouts = getattr(settings, 'POSTORIUS_CACHE_TIMEOUTS', {})
+        return timeouts.get(kind, self.timeouts.get(kind, 0))
+
+    def _generation(self, scope):
+        key = 'postorius:generation:{}'.format(scope)
+        generation = self.cache.get(key)
+        if generation is None:
+            # Start from the current time, so that an evicted generation
+            # doesn't bring back older entries.
+            self.cache.add(key, int(time.time() * 1000), None)
+            generation = self.cache.get(key, 0)
+        return generation
+
+    def _key(self, kind, scope, key):
+        key = '{}:{}:{}'.format(scope, self._generation(scope), key)
+        return 'postorius:{}:{}'.format(
+            kind, hashlib.md5(key.encode('utf-8')).hexdigest())
+
+    def get(self, kind, scope, key):
+        """Return the cached value, or None."""
+        if not self.get_timeout(kind):
+            return None
+        return self.cache.get(self._key(kind, scope, key))
+
+    def set(self, kind, scope, key, value):
+        timeout = self.get_timeout(kind)
+        if timeout:
+            self.cache.set(self._key(kind, scope, key), value, timeout)
+
+    def delete(self, kind, scope, key):
+        if self.cache is not None:
+            self.cache.delete(self._key(kind, scope, key))
+
+    def invalidate(self, scope):
+        """Forget every entry of the given scope."""
+        if self.cache is None:
+            return
+        key = 'postorius:generation:{}'.format(scope)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, int(time.time() * 1000), None)
+
+    def _resolve(self, path, data, api_version):
+        for kind, regex, get_scope in self.resources:
+            match = regex.match(path)
+            if match is not None:
+                scope = get_scope(match, data)
+                if scope:
+                    # The representations differ between API versions.
+                    key = '{}/{}'.format(api_version, path)
+                    if data:
+                        key += '?' + urlencode(sorted(data.items()))
+                    return kind, scope, key
+        return None, None, None
+
+    def get_resource(self, path, data=None, api_version=None):
+        """Return the cached content of a REST resource, or None."""
+        kind, scope, key = self._resolve(path, data, api_version)
+        if kind is None:
+            return None
+        return self.get(kind, scope, key)
+
+    def set_resource(self, path, content, data=None, api_version=None):
+        kind, scope, key = self._resolve(path, data, api_version)
+        if kind is not None:
+            self.set(kind, scope, key, content)
+
+
+mailman_cache = MailmanCache()
+
+# Let the REST connection serve the cacheable resources from here.
+MailmanConnection.shared_cache = mailman_cache
+
+
 class MailmanRestManager(object):
     """Manager class to give a model class CRUD access to the API.
     Returns objects (or lists of objects) retrieved from the API.
@@ -125,6 +280,120 @@ class MailmanRestManager(object):
         """
         pass
 
+    def invalidate_cache(self):
+        """Forget the cached resources of this kind."""
+        mailman_cache.invalidate(self.resource_name_plural)
+
+
+class MailmanDomainManager(MailmanRestManager):
+
+    def __init__(self):
+        super(MailmanDomainManager, self).__init__('domain', 'domains')
+
+    def get_owner_addresses(self, mail_host):
+        """Return all the addresses of all the owners of a domain.
+
+        The result is cached until the domains are invalidated.
+
+        :param mail_host: The domain's mail host.
+        :type mail_host: str
+        :rtype: set
+        """
+        addresses = mailman_cache.get('domain_owners', 'domains', mail_host)
+        if addresses is None:
+            domain = self.get_or_404(mail_host=mail_host)
+            try:
+                owners_addresses = concurrent_map(
+                    lambda owner: [each.email for each in owner.addresses],
+                    domain.owners)
+            except MailmanConnectionError as e:
+                raise MailmanApiError(e)
+            addresses = set(address for owner_addresses in owners_addresses
+                            for address in owner_addresses)
+            mailman_cache.set('domain_owners', 'domains', mail_host,
+                              addresses)
+        return addresses
+
+    def get_sites(self, mail_hosts, default_site):
+        """Return the web site of every domain.
+
+        Domains without a `MailDomain` are attached to the default site. The
+        result is cached until the domains are invalidated.
+
+        :param mail_hosts: The mail hosts of the domains.
+        :param default_site: The site of the domains which don't have one, or
+            a callable returning it.
+        :type default_site: django.contrib.sites.models.Site
+        :return: The site of each mail host.
+        :rtype: dict
+        """
+        sites = mailman_cache.get('domain_sites', 'domains', 'all') or {}
+        missing = [mail_host for mail_host in mail_hosts
+                   if mail_host not in sites]
+        if missing:
+            for web_host in MailDomain.objects.filter(
+                    mail_domain__in=missing).select_related('site'):
+                sites[web_host.mail_domain] = web_host.site
+            missing = [mail_host for mail_host in missing
+                       if mail_host not in sites]
+            if missing:
+                if callable(default_site):
+                    default_site = default_site()
+                MailDomain.objects.bulk_create([
+                    MailDomain(site=default_site, mail_domain=mail_host)
+                    for mail_host in missing])
+                sites.update((mail_host, default_site)
+                             for mail_host in missing)
+            mailman_cache.set('domain_sites', 'domains', 'all', sites)
+        return sites
+
+
+BulkUnsubscribeResult = namedtuple(
+    'BulkUnsubscribeResult', ['unsubscribed', 'not_members', 'errors'])
+
+BulkModerationResult = namedtuple(
+    'BulkModerationResult', ['moderated', 'errors'])
+
+MODERATION_ACTIONS = ('accept', 'reject', 'discard')
+
+HeldMessageSummary = namedtuple(
+    'HeldMessageSummary',
+    ['request_id', 'sender', 'subject', 'reason', 'hold_date', 'preview'])
+
+HELD_PREVIEW_LENGTH = 200
+
+
+class SubscriptionRequestPage(list):
+    """A page of subscription requests, as dicts."""
+
+    def __init__(self, entries, total_size):
+        super(SubscriptionRequestPage, self).__init__(entries)
+        self.total_size = total_size
+
+
+def _message_preview(raw, length=HELD_PREVIEW_LENGTH):
+    """Return the beginning of the text of a raw message."""
+    try:
+        message = message_from_string(raw or '', policy=policy.default)
+        body = message.get_body(preferencelist=('plain', ))
+        text = body.get_content() if body is not None else ''
+    except Exception:
+        # Previews are a convenience, don't fail on broken messages.
+        logger.debug('Could not make a preview of a held message.',
+                     exc_info=True)
+        return ''
+    text = ' '.join(text.split())
+    if len(text) > length:
+        text = text[:length].rstrip() + '\u2026'
+    return text
+
+
+DEFAULT_ROSTER_PAGE_SIZE = 500
+DEFAULT_HELD_PAGE_SIZE = 100
+DEFAULT_DOMAIN_LIST_PAGE_SIZE = 100
+DEFAULT_FIND_PAGE_SIZE = 500
+DEFAULT_REQUEST_PAGE_SIZE = 500
+
 
 class MailmanListManager(MailmanRestManager):
 
@@ -141,13 +410,523 @@ class MailmanListManager(MailmanRestManager):
         except MailmanConnectionError as e:
             raise MailmanApiError(e)
 
+    def invalidate_cache(self, list_id):
+        """Forget the cached settings and archivers of a list."""
+        mailman_cache.invalidate(_list_scope(list_id))
+
+    def get_cached_held_message(self, list_id, held_id):
+        """Return the cached rendering of a held message, or None."""
+        return mailman_cache.get('held_messages', _list_scope(list_id),
+                                 str(held_id))
+
+    def cache_held_message(self, list_id, held_id, rendered):
+        mailman_cache.set('held_messages', _list_scope(list_id),
+                          str(held_id), rendered)
+
+    def forget_held_message(self, list_id, held_id):
+        """Forget the cached rendering of a moderated held message, and the
+        searches it was found by."""
+        for kind in ('held_messages', 'held_previews'):
+            mailman_cache.delete(kind, _list_scope(list_id), str(held_id))
+        mailman_cache.invalidate(_held_scope(list_id))
+
+    def summarize_held_messages(self, list_id, held_messages):
+        """Return light summaries of held messages, with a text preview.
+
+        The summaries don't keep the raw messages, so that listing them
+        doesn't depend on their size. Previews are cached per message.
+
+        :param list_id: The list the messages are held for.
+        :param held_messages: The held messages.
+        :rtype: list of HeldMessageSummary
+        """
+        scope = _list_scope(list_id)
+        summaries = []
+        for held in held_messages:
+            held_id = str(held.request_id)
+            preview = mailman_cache.get('held_previews', scope, held_id)
+            if preview is None:
+                preview = _message_preview(held.msg)
+                mailman_cache.set('held_previews', scope, held_id, preview)
+            summaries.append(HeldMessageSummary(
+                held.request_id, held.sender, held.subject, held.reason,
+                held.hold_date, preview))
+        return summaries
+
+    def get_request_page(self, mailing_list, token_owner='moderator',
+                         count=25, page=1):
+        """Return a page of the pending subscription requests of a list.
+
+        Core filters the requests by token owner and paginates them, so that
+        the requests waiting for the subscribers' confirmation are never
+        transferred.
+
+        :param mailing_list: The list of the requests.
+        :type mailing_list: mailmanclient.MailingList
+        :param token_owner: Who must act on the requests: 'moderator',
+            'subscriber' or None for all the requests.
+        :param count: The number of requests per page.
+        :param page: The page number, starting at 1.
+        :return: The requests, with the number of matching requests in
+            `total_size`.
+        :rtype: SubscriptionRequestPage
+        """
+        query = [('count', count), ('page', page)]
+        if token_owner is not None:
+            query.insert(0, ('token_owner', token_owner))
+        path = 'lists/{}/requests?{}'.format(
+            mailing_list.list_id, urlencode(query))
+        try:
+            response, content = get_mailman_client()._connection.call(path)
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+        # Older Cores ignore the filter, drop what it didn't.
+        return SubscriptionRequestPage(
+            [entry for entry in content.get('entries', [])
+             if token_owner is None or
+             entry.get('token_owner') == token_owner],
+            content.get('total_size', 0))
+
+    def bulk_moderate_requests(self, mailing_list, tokens, action):
+        """Moderate subscription requests concurrently.
+
+        Requests that were already moderated count as moderated.
+
+        :param mailing_list: The list of the requests.
+        :type mailing_list: mailmanclient.MailingList
+        :param tokens: The tokens of the requests.
+        :param action: One of `MODERATION_ACTIONS`.
+        :rtype: BulkModerationResult
+        """
+        if action not in MODERATION_ACTIONS:
+            raise ValueError('Unknown moderation action: {}'.format(action))
+        tokens = list(dict.fromkeys(tokens))
+        try:
+            outcomes = concurrent_map(
+                lambda token: mailing_list.moderate_request(token, action),
+                tokens, return_exceptions=True)
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+        result = BulkModerationResult([], {})
+        for token, outcome in zip(tokens, outcomes):
+            if isinstance(outcome, MailmanConnectionError):
+                raise MailmanApiError(outcome)
+            elif isinstance(outcome, HTTPError):
+                if outcome.code == 409:
+                    # Already moderated, e.g. by another moderator.
+                    result.moderated.append(token)
+                else:
+                    result.errors[token] = get_error_message(outcome)
+            elif isinstance(outcome, Exception):
+                raise outcome
+            else:
+                result.moderated.append(token)
+        self.forget_requests(mailing_list.list_id)
+        return result
+
+    def forget_requests(self, list_id):
+        """Forget what is cached about the pending requests of a list."""
+        mailman_cache.invalidate(_requests_scope(list_id))
+
+    def prefetch_settings(self, mailing_lists):
+        """Load the settings of several lists at once.
+
+        The settings are fetched concurrently (or from the cache) and
+        attached to each list as `prefetched_settings`, so that templates
+        rendering many lists don't make one REST call per list.
+
+        :param mailing_lists: The lists to load the settings of.
+        :type mailing_lists: Iterable of mailmanclient.MailingList
+        :return: The lists.
+        :rtype: list
+        """
+        mailing_lists = list(mailing_lists)
+
+        def load(mlist):
+            list_settings = mlist.settings
+            # Settings are lazy, reading any key fetches all of them.
+            list_settings['advertised']
+            return list_settings
+
+        try:
+            all_settings = concurrent_map(load, mailing_lists)
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+        for mlist, list_settings in zip(mailing_lists, all_settings):
+            mlist.prefetched_settings = list_settings
+        return mailing_lists
+
+    def find_by_subscriber(self, addresses, role=None):
+        """Return the lists in which any of the addresses has a membership.
+
+        The addresses are looked up concurrently.
+
+        :param addresses: The email addresses to look up.
+        :param role: Only return lists where the addresses have this role.
+        :return: The lists found, a list may be returned more than once.
+        :rtype: list
+        """
+        results = self._find_lists_per_address(addresses, role)
+        return [mlist for lists in results for mlist in lists]
+
+    def _find_lists_per_address(self, addresses, role):
+        client = get_mailman_client()
+        page_size = getattr(settings, 'POSTORIUS_FIND_PAGE_SIZE',
+                            DEFAULT_FIND_PAGE_SIZE)
+
+        def find(address):
+            # Searches are paginated, go through all the pages: these results
+            # grant the list owner and moderator permissions.
+            lists = []
+            page = 1
+            while True:
+                try:
+                    found = client.find_lists(
+                        address, role=role, count=page_size, page=page)
+                except HTTPError:
+                    # No lists exist with the given role for the given
+                    # address.
+                    found = []
+                lists.extend(found)
+                if len(found) < page_size:
+                    return lists
+                page += 1
+
+        try:
+            return concurrent_map(find, addresses)
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+
+    def get_subscribed_address(self, mailing_list, addresses):
+        """Return the first of the addresses subscribed to a list.
+
+        The membership of each address in the list is searched concurrently
+        and cached until the address subscribes or unsubscribes through
+        Postorius, so it costs no request on most page views.
+
+        :param mailing_list: The list.
+        :type mailing_list: mailmanclient.MailingList
+        :param addresses: The email addresses to look up, in order.
+        :return: The subscribed address, or None.
+        """
+        connection = get_mailman_client()._connection
+
+        def is_member(address):
+            try:
+                response, content = connection.call('members/find', dict(
+                    list_id=mailing_list.list_id, subscriber=address,
+                    role='member'))
+            except HTTPError:
+                # Not a member.
+                return False
+            return bool(content.get('entries'))
+
+        addresses = list(addresses)
+        try:
+            members = concurrent_map(is_member, addresses)
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+        for address, member in zip(addresses, members):
+            if member:
+                return address
+        return None
+
+    def get_pending_address(self, mailing_list, addresses):
+        """Return the first of the addresses with a pending subscription.
+
+        The emails of all the pending requests of the list are fetched once,
+        the pages concurrently, and cached for a short time or until the
+        requests of the list change through Postorius.
+
+        :param mailing_list: The list.
+        :type mailing_list: mailmanclient.MailingList
+        :param addresses: The email addresses to look up, in order.
+        :return: The address, or None.
+        """
+        scope = _requests_scope(mailing_list.list_id)
+        pending = mailman_cache.get('pending_requests', scope, 'emails')
+        if pending is None:
+            page_size = getattr(settings, 'POSTORIUS_REQUEST_PAGE_SIZE',
+                                DEFAULT_REQUEST_PAGE_SIZE)
+            requests = self._get_all_pages(
+                lambda count, page: self.get_request_page(
+                    mailing_list, token_owner=None, count=count, page=page),
+                page_size)
+            pending = set(request['email'].lower() for request in requests)
+            mailman_cache.set('pending_requests', scope, 'emails', pending)
+        for address in addresses:
+            if address.lower() in pending:
+                return address
+        return None
+
+    def _get_all_pages(self, get_page, page_size, limit=None):
+        """Return the entries of all the pages of a paginated resource.
+
+        The first page gives the number of pages, the others are then
+        fetched concurrently. Returns None if that would take more than
+        `limit` requests.
+        """
+        first = get_page(count=page_size, page=1)
+        pages = max(1, -(-first.total_size // page_size))
+        if limit is not None and pages > limit:
+            return None
+        rest = concurrent_map(
+            lambda page: list(get_page(count=page_size, page=page)),
+            range(2, pages + 1))
+        return [entry for entries in [list(first)] + rest
+                for entry in entries]
+
+    def _get_roster(self, mailing_list, limit):
+        """Return the members of a list by lowercased address.
+
+        Returns None if fetching the roster would take more than `limit`
+        requests.
+        """
+        page_size = getattr(settings, 'POSTORIUS_ROSTER_PAGE_SIZE',
+                            DEFAULT_ROSTER_PAGE_SIZE)
+        members = self._get_all_pages(
+            mailing_list.get_member_page, page_size, limit)
+        if members is None:
+            return None
+        return dict((member.email.lower(), member) for member in members)
+
+    def bulk_unsubscribe(self, mailing_list, addresses):
+        """Unsubscribe many addresses from a list at once.
+
+        The addresses are unsubscribed concurrently. When it takes fewer
+        requests than there are addresses, the roster is fetched first so
+        that addresses which aren't subscribed are skipped without a call.
+
+        :param mailing_list: The list to unsubscribe the addresses from.
+        :type mailing_list: mailmanclient.MailingList
+        :param addresses: The email addresses to unsubscribe.
+        :return: The unsubscribed addresses, the addresses that weren't
+            members and a dict of the error message for each failed address.
+        :rtype: BulkUnsubscribeResult
+        """
+        addresses = list(dict.fromkeys(
+            address.lower() for address in addresses))
+        result = BulkUnsubscribeResult([], [], {})
+        try:
+            roster = self._get_roster(mailing_list, len(addresses))
+            if roster is not None:
+                members = []
+                for address in addresses:
+                    if address in roster:
+                        members.append(address)
+                    else:
+                        result.not_members.append(address)
+                outcomes = concurrent_map(
+                    lambda address: roster[address].unsubscribe(), members,
+                    return_exceptions=True)
+            else:
+                members = addresses
+                outcomes = concurrent_map(
+                    mailing_list.unsubscribe, members, return_exceptions=True)
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+        for address, outcome in zip(members, outcomes):
+            if isinstance(outcome, MailmanConnectionError):
+                raise MailmanApiError(outcome)
+            elif isinstance(outcome, ValueError):
+                # mailmanclient raises this for addresses not subscribed.
+                result.not_members.append(address)
+            elif isinstance(outcome, HTTPError):
+                result.errors[address] = get_error_message(outcome)
+            elif isinstance(outcome, Exception):
+                raise outcome
+            else:
+                result.unsubscribed.append(address)
+        Member.objects.invalidate_cache(*result.unsubscribed)
+        return result
+
+    def find_held_messages(self, mailing_list, **filters):
+        """Return the held messages of a list matching the filters.
+
+        All the pages of held messages are searched.
+
+        :param mailing_list: The list to search.
+        :type mailing_list: mailmanclient.MailingList
+        :param filters: Text to find in the held messages' attribute of the
+            same name (`sender`, `subject` or `reason`), case-insensitively.
+        :rtype: list
+        """
+        page_size = getattr(settings, 'POSTORIUS_HELD_PAGE_SIZE',
+                            DEFAULT_HELD_PAGE_SIZE)
+        filters = [(key, value.lower()) for key, value in filters.items()
+                   if value]
+        try:
+            held_messages = self._get_all_pages(
+                mailing_list.get_held_page, page_size)
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+        return [held for held in held_messages
+                if all(value in (getattr(held, key) or '').lower()
+                       for key, value in filters)]
+
+    def find_held_message_ids(self, mailing_list, **filters):
+        """Return the ids of the held messages of a list matching the filters.
+
+        The ids are cached for a short time, so that going through the pages
+        of a search doesn't download all the held messages every time. See
+        `find_held_messages` for the filters.
+
+        :rtype: list
+        """
+        scope = _held_scope(mailing_list.list_id)
+        key = urlencode(sorted((key, value.lower())
+                               for key, value in filters.items() if value))
+        held_ids = mailman_cache.get('held_searches', scope, key)
+        if held_ids is None:
+            held_ids = [held.request_id for held
+                        in self.find_held_messages(mailing_list, **filters)]
+            mailman_cache.set('held_searches', scope, key, held_ids)
+        return held_ids
+
+    def get_held_messages(self, mailing_list, held_ids):
+        """Return held messages by id, fetched concurrently.
+
+        The messages which were moderated meanwhile are left out.
+
+        :param mailing_list: The list the messages are held for.
+        :type mailing_list: mailmanclient.MailingList
+        :param held_ids: The request ids of the held messages.
+        :rtype: list
+        """
+        try:
+            outcomes = concurrent_map(mailing_list.get_held_message, held_ids,
+                                      return_exceptions=True)
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+        held_messages = []
+        for outcome in outcomes:
+            if isinstance(outcome, MailmanConnectionError):
+                raise MailmanApiError(outcome)
+            elif isinstance(outcome, HTTPError) and outcome.code == 404:
+                continue
+            elif isinstance(outcome, Exception):
+                raise outcome
+            held_messages.append(outcome)
+        return held_messages
+
+    def bulk_moderate(self, mailing_list, held_ids, action):
+        """Accept, reject or discard held messages concurrently.
+
+        :param mailing_list: The list the messages are held for.
+        :type mailing_list: mailmanclient.MailingList
+        :param held_ids: The request ids of the held messages.
+        :param action: One of `MODERATION_ACTIONS`.
+        :return: The ids of the moderated messages and a dict of the error
+            message for each message that couldn't be moderated.
+        :rtype: BulkModerationResult
+        """
+        if action not in MODERATION_ACTIONS:
+            raise ValueError('Unknown moderation action: {}'.format(action))
+        moderate = getattr(mailing_list, '{}_message'.format(action))
+        held_ids = list(dict.fromkeys(str(held_id) for held_id in held_ids))
+        try:
+            outcomes = concurrent_map(moderate, held_ids,
+                                      return_exceptions=True)
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+        result = BulkModerationResult([], {})
+        for held_id, outcome in zip(held_ids, outcomes):
+            if isinstance(outcome, MailmanConnectionError):
+                raise MailmanApiError(outcome)
+            elif isinstance(outcome, HTTPError):
+                if outcome.code == 404:
+                    # Already moderated, e.g. by another moderator.
+                    result.errors[held_id] = _('Message could not be found')
+                else:
+                    result.errors[held_id] = get_error_message(outcome)
+            elif isinstance(outcome, Exception):
+                raise outcome
+            else:
+                result.moderated.append(held_id)
+                self.forget_held_message(mailing_list.list_id, held_id)
+        return result
+
+    def get_page_by_mail_host(self, mail_host, count=50, page=1,
+                              advertised=False):
+        """Return a page of the lists of a domain.
+
+        The lists are fetched from the domain's own collection in Core. The
+        number of lists of the domain is cached, see `count_by_mail_host`.
+
+        :param mail_host: The domain's mail host.
+        :param count: The number of lists per page.
+        :param page: The page number, starting at 1.
+        :param advertised: Only return the advertised lists.
+        :rtype: mailmanclient.Page
+        :raises Mailman404Error: If the domain doesn't exist.
+        """
+        domain = Domain.objects.get(mail_host=mail_host)
+        try:
+            list_page = domain.get_list_page(
+                count=count, page=page, advertised=advertised or None)
+            total_size = list_page.total_size
+        except MailmanConnectionError as e:
+            raise MailmanApiError(e)
+        mailman_cache.set('domain_list_counts', _domain_scope(mail_host),
+                          str(bool(advertised)), total_size)
+        return list_page
+
+    def iter_by_mail_host(self, mail_host, advertised=False, page_size=None):
+        """Iterate over the lists of a domain, fetching a page at a time.
+
+        :param page_size: The number of lists per request. Defaults to
+            ``POSTORIUS_DOMAIN_LIST_PAGE_SIZE``.
+        :raises Mailman404Error: If the domain doesn't exist.
+        """
+        if page_size is None:
+            page_size = getattr(settings, 'POSTORIUS_DOMAIN_LIST_PAGE_SIZE',
+                                DEFAULT_DOMAIN_LIST_PAGE_SIZE)
+        page = 1
+        while True:
+            list_page = self.get_page_by_mail_host(
+                mail_host, count=page_size, page=page, advertised=advertised)
+            for mailing_list in list_page:
+                yield mailing_list
+            if not list_page.has_next:
+                break
+            page += 1
+
+    def count_by_mail_host(self, mail_host, advertised=False):
+        """Return the number of lists of a domain, which is cached.
+
+        :rtype: int
+        :raises Mailman404Error: If the domain doesn't exist.
+        """
+        count = mailman_cache.get('domain_list_counts',
+                                  _domain_scope(mail_host),
+                                  str(bool(advertised)))
+        if count is None:
+            count = self.get_page_by_mail_host(
+                mail_host, count=1, advertised=advertised).total_size
+        return count
+
+    def forget_counts(self, mail_host):
+        """Forget the cached number of lists of a domain."""
+        mailman_cache.invalidate(_domain_scope(mail_host))
+
     def by_mail_host(self, mail_host, advertised=False):
-        objects = self.all(advertised)
-        host_objects = []
-        for obj in objects:
-            if obj.mail_host == mail_host:
-                host_objects.append(obj)
-        return host_objects
+        """Return all the lists of a domain, or an empty list if the domain
+        doesn't exist."""
+        try:
+            return list(self.iter_by_mail_host(mail_host, advertised))
+        except Mailman404Error:
+            return []
+
+
+class MailmanMemberManager(MailmanRestManager):
+
+    def __init__(self):
+        super(MailmanMemberManager, self).__init__('member', 'members')
+
+    def invalidate_cache(self, *addresses):
+        """Forget the cached memberships of the given addresses."""
+        for address in addresses:
+            mailman_cache.invalidate(_address_scope(address))
 
 
 class MailmanUserManager(MailmanRestManager):
@@ -160,10 +939,39 @@ class MailmanUserManager(MailmanRestManager):
             email=user.email, password=None, display_name=user.get_full_name())
 
     def get_or_create_from_django(self, user):
+        """Return the Mailman user of a Django user, creating it if needed.
+
+        Once found, the Mailman user is fetched by its id, stored in a
+        `MailmanUserLink`. The link is dropped when the Mailman user doesn't
+        exist anymore.
+        """
+        link = MailmanUserLink.objects.filter(user=user).first()
+        if link is not None:
+            try:
+                return self.get(address=link.mailman_id)
+            except Mailman404Error:
+                # The user was deleted from Core, look it up again.
+                link.delete()
         try:
-            return self.get(address=user.email)
+            mm_user = self.get(address=user.email)
         except Mailman404Error:
-            return self.create_from_django(user)
+            mm_user = self.create_from_django(user)
+        self.link_django_user(user, mm_user)
+        return mm_user
+
+    def link_django_user(self, user, mm_user):
+        """Remember the Mailman user of a Django user.
+
+        :param user: The Django user.
+        :type user: django.contrib.auth.models.User
+        :param mm_user: Its Mailman user.
+        :type mm_user: mailmanclient.User
+        :rtype: MailmanUserLink
+        """
+        link, created = MailmanUserLink.objects.update_or_create(
+            user=user, defaults={'mailman_id': str(mm_user.user_id),
+                                 'self_link': mm_user.self_link})
+        return link
 
 
 class MailmanRestModel(object):
@@ -186,7 +994,7 @@ class MailmanRestModel(object):
 class Domain(MailmanRestModel):
     """Domain model class.
     """
-    objects = MailmanRestManager('domain', 'domains')
+    objects = MailmanDomainManager()
 
 
 class List(MailmanRestModel):
@@ -204,7 +1012,7 @@ class MailmanUser(MailmanRestModel):
 class Member(MailmanRestModel):
     """Member model class.
     """
-    objects = MailmanRestManager('member', 'members')
+    objects = MailmanMemberManager()
 
 
 class Style(MailmanRestModel):
@@ -220,6 +1028,47 @@ TEMPLATE_CONTEXT_CHOICES = (
 )
 
 
+class EmailTemplateManager(models.Manager):
+
+    @staticmethod
+    def _served_key(context, identifier, name):
+        return '{}:{}:{}'.format(context, identifier, name)
+
+    def get_served(self, context, identifier, name):
+        """Return the template served to Core, from the cache if possible.
+
+        The cached entry is checked against the template's modification time,
+        so that changes made by another process are served right away.
+
+        :return: The template's data, its modification time and an ETag.
+        :rtype: dict
+        :raises EmailTemplate.DoesNotExist: If there is no such template.
+        :raises MultipleObjectsReturned: If there is one per language.
+        """
+        templates = self.filter(
+            context=context, identifier=identifier, name=name)
+        modified = list(templates.values_list('modified_at', flat=True)[:2])
+        if not modified:
+            raise self.model.DoesNotExist
+        if len(modified) > 1:
+            raise self.model.MultipleObjectsReturned
+        key = self._served_key(context, identifier, name)
+        served = mailman_cache.get('template_data', 'templates', key)
+        if served is None or served['modified_at'] != modified[0]:
+            template = templates.get()
+            version = '{}\n{}'.format(
+                template.modified_at.isoformat(), template.data)
+            etag = hashlib.md5(version.encode('utf-8')).hexdigest()
+            served = dict(data=template.data,
+                          modified_at=template.modified_at, etag=etag)
+            mailman_cache.set('template_data', 'templates', key, served)
+        return served
+
+    def forget_served(self, template):
+        mailman_cache.delete('template_data', 'templates', self._served_key(
+            template.context, template.identifier, template.name))
+
+
 class EmailTemplate(models.Model):
     """A Template represents contents of partial or complete emails sent out by
     Mailman Core on various events or when an action is required. Headers and
@@ -256,6 +1105,8 @@ class EmailTemplate(models.Model):
     context = models.CharField(max_length=50, choices=TEMPLATE_CONTEXT_CHOICES)
     identifier = models.CharField(blank=True, max_length=100)
 
+    objects = EmailTemplateManager()
+
     class Meta:
         unique_together = ('name', 'identifier', 'language')
 
@@ -307,10 +1158,153 @@ class EmailTemplate(models.Model):
 
 
 @receiver(post_save, sender=EmailTemplate)
-def update_core_post_update(sender, **kwargs):
-    kwargs['instance']._update_core()
+@receiver(post_delete, sender=EmailTemplate)
+def forget_served_template(sender, **kwargs):
+    # Once committed, so that a concurrent request can't cache the template
+    # again from before the change.
+    template = kwargs['instance']
+    transaction.on_commit(
+        lambda: EmailTemplate.objects.forget_served(template))
 
 
-@receiver(post_delete, sender=EmailTemplate)
-def update_core_post_delete(sender, **kwargs):
-    kwargs['instance']._update_core(deleted=True)
+class MembershipJob(models.Model):
+    """A bulk membership operation on a mailing list.
+
+    Large operations, like mass subscriptions, are recorded as a job with one
+    `MembershipJobResult` per address and processed in batches outside of the
+    request that created them, see `postorius.jobs`.
+    """
+
+    SUBSCRIBE = 'subscribe'
+    UNSUBSCRIBE_ALL = 'unsubscribe_all'
+    ACTION_CHOICES = (
+        (SUBSCRIBE, _('Subscribe')),
+        (UNSUBSCRIBE_ALL, _('Unsubscribe all members')),
+    )
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    )
+
+    list_id = models.CharField(max_length=255, db_index=True)
+    action = models.CharField(max_length=30, choices=ACTION_CHOICES)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    created_by = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # The next page of the roster to collect addresses from, for jobs which
+    # act on existing members. None once all the addresses are collected.
+    cursor = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created_at', )
+
+    def __str__(self):
+        return '<MembershipJob {0} on {1} ({2})>'.format(
+            self.action, self.list_id, self.status)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def progress(self):
+        """Percentage of the addresses that have been processed."""
+        if not self.total:
+            return 100 if self.is_finished else 0
+        return min(100, self.processed * 100 // self.total)
+
+
+class MembershipJobResult(models.Model):
+    """The outcome of a `MembershipJob` for a single address."""
+
+    PENDING = 'pending'
+    SUCCESS = 'success'
+    ERROR = 'error'
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (SUCCESS, _('Success')),
+        (ERROR, _('Error')),
+    )
+
+    job = models.ForeignKey(
+        MembershipJob, related_name='results', on_delete=models.CASCADE)
+    address = models.CharField(max_length=255)
+    display_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    message = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ('pk', )
+
+    def __str__(self):
+        return '<MembershipJobResult {0} ({1})>'.format(
+            self.address, self.status)
+
+
+class MailmanUserLink(models.Model):
+    """The Mailman user of a Django user.
+
+    This saves looking the Mailman user up by email address on every request,
+    see `MailmanUserManager.get_or_create_from_django`. Existing users can be
+    linked with the ``link_mailman_users`` management command.
+    """
+
+    user = models.OneToOneField(
+        User, related_name='mailman_user_link', on_delete=models.CASCADE)
+    mailman_id = models.CharField(max_length=255)
+    self_link = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '<MailmanUserLink {0} to {1}>'.format(
+            self.user, self.mailman_id)
+
+
+class CoreUpdate(models.Model):
+    """A change to send to Mailman Core, outside of the request making it.
+
+    Updates are delivered by `postorius.outbox` once the transaction that
+    queued them is committed, and retried until Core accepts them. There is
+    at most one update per key: queuing another update for the same object
+    replaces the pending one.
+    """
+
+    CREATE_USER = 'create_user'
+    SET_TEMPLATE = 'set_template'
+    ACTION_CHOICES = (
+        (CREATE_USER, _('Create the Mailman user')),
+        (SET_TEMPLATE, _('Set or remove a template')),
+    )
+
+    key = models.CharField(max_length=255, unique=True)
+    action = models.CharField(max_length=30, choices=ACTION_CHOICES)
+    # JSON encoded arguments of the action.
+    payload = models.TextField()
+    # Incremented whenever the update is replaced, so that a delivery of the
+    # previous version doesn't remove it.
+    version = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(db_index=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('next_attempt_at', 'pk')
+
+    def __str__(self):
+        return '<CoreUpdate {0} ({1} attempts)>'.format(
+            self.key, self.attempts)
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Delivery of the changes to Mailman Core made by model signals.
+
+Saving a Django user or an email template has to be reflected in Core.
+Instead of calling Core from the signal handler, in the middle of the saving
+request and its transaction, the change is queued as a `CoreUpdate` and
+delivered once the transaction is committed. Pending updates for the same
+object are collapsed into one, deliveries are made concurrently by batches
+and failed deliveries are retried with an exponential backoff.
+
+How updates are delivered is controlled by the ``POSTORIUS_OUTBOX_RUNNER``
+setting:
+
+``'thread'`` (default)
+    in a background thread of the web process, once the transaction is
+    committed. The thread keeps running until the failed updates are
+    delivered, waiting for each of them to be due.
+``'command'``
+    by a separate worker running the ``dispatch_core_updates`` management
+    command.
+``'inline'``
+    synchronously, in the request that queued them.
+"""
+
+from __future__ import (
+    absolute_import, division, print_function, unicode_literals)
+
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Min
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404
+from django.utils import timezone
+
+from postorius.models import (
+    CoreUpdate, EmailTemplate, Mailman404Error, MailmanUser)
+from postorius.utils import concurrent_map, get_error_message
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTBOX_RUNNER = 'thread'
+DEFAULT_OUTBOX_BATCH_SIZE = 50
+# Delay before retrying a failed delivery, doubled after every failure.
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 3600
+# Time after which an update claimed by a worker which didn't report back,
+# e.g. because it was killed, can be delivered again.
+CLAIM_TIMEOUT = 300
+
+
+@receiver(post_save, sender=User)
+def create_mailman_user(sender, **kwargs):
+    if kwargs.get('created'):
+        user = kwargs.get('instance')
+        if getattr(settings, 'AUTOCREATE_MAILMAN_USER', False) and user.email:
+            enqueue(CoreUpdate.CREATE_USER, 'user:{}'.format(user.pk),
+                    user=user.pk, email=user.email,
+                    display_name=user.get_full_name())
+
+
+@receiver(post_save, sender=EmailTemplate)
+def update_core_post_update(sender, **kwargs):
+    enqueue_template(kwargs['instance'])
+
+
+@receiver(post_delete, sender=EmailTemplate)
+def update_core_post_delete(sender, **kwargs):
+    enqueue_template(kwargs['instance'], deleted=True)
+
+
+def enqueue_template(template, deleted=False, schedule=True):
+    """Queue setting a template's URL in Core, or removing it."""
+    # Core has one template per name and context object, whatever the
+    # language.
+    key = 'template:{}:{}:{}'.format(
+        template.context, template.identifier, template.name)
+    enqueue(CoreUpdate.SET_TEMPLATE, key, schedule=schedule,
+            context=template.context, identifier=template.identifier,
+            name=template.name, deleted=deleted)
+
+
+def _create_user(payload):
+    try:
+        return MailmanUser.objects.get(address=payload['email'])
+    except Mailman404Error:
+        # Not created yet, or not by a previous attempt.
+        return MailmanUser.objects.create(
+            email=payload['email'], password=None,
+            display_name=payload['display_name'])
+
+
+def _link_user(payload, mm_user):
+    user = User.objects.filter(pk=payload['user']).first()
+    if user is not None:
+        MailmanUser.objects.link_django_user(user, mm_user)
+
+
+def _set_template(payload):
+    template = EmailTemplate(context=payload['context'],
+                             identifier=payload['identifier'],
+                             name=payload['name'])
+    try:
+        template._update_core(deleted=payload['deleted'])
+    except Http404:
+        logger.info('The %s %s of template %s does not exist anymore.',
+                    payload['context'], payload['identifier'],
+                    payload['name'])
+
+
+# The function delivering an update, for each action. It runs concurrently
+# with the other deliveries of a batch and must not use the database.
+ACTION_HANDLERS = {
+    CoreUpdate.CREATE_USER: _create_user,
+    CoreUpdate.SET_TEMPLATE: _set_template,
+}
+
+# The function called with the payload and the result of a successful
+# delivery, for the actions that need to record it.
+ACTION_CALLBACKS = {
+    CoreUpdate.CREATE_USER: _link_user,
+}
+
+
+def enqueue(action, key, schedule=True, **payload):
+    """Queue an update to Core, replacing the pending update with that key.
+
+    :param action: One of the `CoreUpdate` actions.
+    :param key: Identifies the object to update in Core.
+    :param schedule: Deliver the update according to
+        ``POSTORIUS_OUTBOX_RUNNER``. Bulk changes queue their updates without
+        scheduling them and call `dispatch_all` afterwards.
+    :param payload: The arguments of the action, which must be JSON
+        serializable.
+    """
+    values = dict(action=action, payload=json.dumps(payload), attempts=0,
+                  next_attempt_at=timezone.now(), last_error='')
+    with transaction.atomic():
+        if not _replace(key, values):
+            try:
+                with transaction.atomic():
+                    CoreUpdate.objects.create(key=key, **values)
+            except IntegrityError:
+                # Queued meanwhile by another request.
+                _replace(key, values)
+    if schedule:
+        schedule_dispatch(key)
+
+
+def _replace(key, values):
+    return CoreUpdate.objects.filter(key=key).update(
+        version=F('version') + 1, **values)
+
+
+def schedule_dispatch(key=None):
+    """Deliver the pending updates according to ``POSTORIUS_OUTBOX_RUNNER``.
+
+    :param key: The update that was just queued. The inline runner only
+        delivers this one.
+    """
+    runner = getattr(settings, 'POSTORIUS_OUTBOX_RUNNER',
+                     DEFAULT_OUTBOX_RUNNER)
+    if runner == 'inline':
+        dispatch(keys=[key] if key else None)
+    elif runner == 'thread':
+        transaction.on_commit(_start_thread)
+    elif runner != 'command':
+        raise ValueError(
+            'Unknown POSTORIUS_OUTBOX_RUNNER: {}'.format(runner))
+
+
+_thread = None
+_thread_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def _start_thread():
+    # A single thread per process delivers the updates, it is woken up if it
+    # is already running.
+    global _thread
+    with _thread_lock:
+        _wakeup.set()
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_run_thread,
+                                   name='postorius-outbox')
+        _thread.daemon = True
+        _thread.start()
+
+
+def _run_thread():
+    global _thread
+    try:
+        while True:
+            _wakeup.clear()
+            try:
+                dispatch_all()
+                delay = get_next_delay()
+            except Exception:
+                logger.exception('Delivering the updates to Core failed.')
+                delay = RETRY_DELAY
+            if delay is not None:
+                # Don't keep the database connection while waiting for the
+                # updates to retry.
+                connection.close()
+                _wakeup.wait(delay)
+                continue
+            with _thread_lock:
+                if not _wakeup.is_set():
+                    _thread = None
+                    return
+    finally:
+        # Threads don't go through the request cycle, close their database
+        # connection ourselves.
+        connection.close()
+
+
+def get_next_delay():
+    """Return the time until the next pending update is due.
+
+    :return: The delay in seconds, or None if no update is pending.
+    :rtype: float
+    """
+    next_attempt_at = CoreUpdate.objects.aggregate(
+        next_attempt_at=Min('next_attempt_at'))['next_attempt_at']
+    if next_attempt_at is None:
+        return None
+    return max((next_attempt_at - timezone.now()).total_seconds(), 0)
+
+
+def get_retry_delay(attempts):
+    """Return the delay before the next delivery of a failed update."""
+    return min(RETRY_DELAY * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY)
+
+
+def dispatch(keys=None, batch_size=None):
+    """Deliver a batch of the updates that are due.
+
+    :param keys: Only deliver the updates with these keys.
+    :param batch_size: The maximum number of updates to deliver. Defaults to
+        ``POSTORIUS_OUTBOX_BATCH_SIZE``.
+    :return: The number of updates that were attempted.
+    :rtype: int
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'POSTORIUS_OUTBOX_BATCH_SIZE',
+                             DEFAULT_OUTBOX_BATCH_SIZE)
+    now = timezone.now()
+    updates = CoreUpdate.objects.filter(next_attempt_at__lte=now)
+    if keys is not None:
+        updates = updates.filter(key__in=keys)
+    updates = [update for update in updates[:batch_size]
+               if _claim(update, now)]
+    outcomes = concurrent_map(
+        lambda update: ACTION_HANDLERS[update.action](
+            json.loads(update.payload)),
+        updates, return_exceptions=True)
+    for update, outcome in zip(updates, outcomes):
+        current = CoreUpdate.objects.filter(
+            pk=update.pk, version=update.version)
+        if isinstance(outcome, Exception):
+            error = get_error_message(outcome)
+            logger.warning('Delivering %s to Core failed: %s', update.key,
+                           error)
+            current.update(
+                attempts=F('attempts') + 1, last_error=error,
+                next_attempt_at=now + timedelta(
+                    seconds=get_retry_delay(update.attempts + 1)))
+            continue
+        callback = ACTION_CALLBACKS.get(update.action)
+        if callback is not None:
+            callback(json.loads(update.payload), outcome)
+        # A newer version is delivered separately.
+        current.delete()
+    return len(updates)
+
+
+def _claim(update, now):
+    # Postpone the update, so that other workers skip it while it is
+    # delivered.
+    return CoreUpdate.objects.filter(
+        pk=update.pk, version=update.version,
+        next_attempt_at=update.next_attempt_at).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_TIMEOUT)) == 1
+
+
+def dispatch_all():
+    """Deliver batches of updates until none is due."""
+    while dispatch():
+        pass
+
+
+def get_backlog():
+    """Return the size of the backlog of updates to deliver.
+
+    :return: The number of pending updates, how many of them failed at
+        least once and the age in seconds of the oldest one.
+    :rtype: dict
+    """
+    updates = CoreUpdate.objects.all()
+    oldest = updates.aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'pending': updates.count(),
+        'failing': updates.filter(attempts__gt=0).count(),
+        'oldest_age': int((timezone.now() - oldest).total_seconds())
+        if oldest else 0,
+    }
@@ -20,6 +20,7 @@ from allauth.account.models import EmailAddress
 from django.contrib.auth.models import User
 from django.urls import reverse
 
+from postorius.models import Member
 from postorius.tests.utils import ViewTestCase
 
 
@@ -97,11 +98,15 @@ class ListIndexPageTest(ViewTestCase):
         # Now, if we subscribe the user to a list, it will show only that list.
         self.foo_list.subscribe(
             self.user.email, pre_confirmed=True, pre_verified=True)
+        # The memberships changed behind Postorius' back, forget the cached
+        # ones instead of waiting for them to expire.
+        Member.objects.invalidate_cache(self.user.email)
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context['lists']), 1)
         # List that you are owners and moderators for should also show up.
         self.bar_list.add_owner(self.user.email)
+        Member.objects.invalidate_cache(self.user.email)
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context['lists']), 2)
@@ -116,6 +121,7 @@ class ListIndexPageTest(ViewTestCase):
         self.assertEqual(len(response.context['lists']), 0)
         # Let's make them an owner of a list and see if it shows up.
         self.foo_list.add_owner(self.user.email)
+        Member.objects.invalidate_cache(self.user.email)
         response = self.client.get(url + '?role=owner')
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context['lists']), 1)
@@ -134,6 +140,7 @@ class ListIndexPageTest(ViewTestCase):
         self.assertEqual(len(response.context['lists']), 0)
         # Let's make them an moderator of a list and see if it shows up.
         self.foo_list.add_moderator(self.user.email)
+        Member.objects.invalidate_cache(self.user.email)
         response = self.client.get(url + '?role=moderator')
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context['lists']), 1)
@@ -153,6 +160,7 @@ class ListIndexPageTest(ViewTestCase):
         # Let's make them an moderator of a list and see if it shows up.
         self.foo_list.subscribe(
             self.user.email, pre_confirmed=True, pre_verified=True)
+        Member.objects.invalidate_cache(self.user.email)
         response = self.client.get(url + '?role=member')
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context['lists']), 1)
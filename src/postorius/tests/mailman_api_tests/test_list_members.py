@@ -18,6 +18,7 @@
 
 from allauth.account.models import EmailAddress
 from django.contrib.auth.models import User
+from django.test import override_settings
 from django.urls import reverse
 
 from postorius.tests.utils import ViewTestCase
@@ -364,3 +365,92 @@ class ListNonMembersTest(ViewTestCase):
         nonmember_emails = [nm.email for nm in self.foo_list.nonmembers]
         self.assertEqual(len(nonmember_emails), 2)
         self.assertFalse('nonmember-1@example.com' in nonmember_emails)
+
+
+class CSVExportTest(ViewTestCase):
+    """Tests for the CSV export of the members of a list."""
+
+    def setUp(self):
+        super(CSVExportTest, self).setUp()
+        self.domain = self.mm_client.create_domain('example.com')
+        self.foo_list = self.domain.create_list('foo')
+        self.owner = User.objects.create_user(
+            'testowner', 'owner@example.com', 'testpass')
+        self.moderator = User.objects.create_user(
+            'testmoderator', 'moderator@example.com', 'testpass')
+        self.user = User.objects.create_user(
+            'testuser', 'test@example.com', 'testpass')
+        for user in (self.owner, self.moderator, self.user):
+            EmailAddress.objects.create(
+                user=user, email=user.email, verified=True)
+        self.foo_list.add_owner('owner@example.com')
+        self.foo_list.add_moderator('moderator@example.com')
+        for i in range(5):
+            self.foo_list.subscribe(
+                'member-{}@example.com'.format(i), 'Member {}'.format(i),
+                pre_verified=True, pre_confirmed=True, pre_approved=True)
+        self.url = reverse('csv_view', args=('foo.example.com', ))
+
+    def _get_rows(self, response):
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return content.splitlines()
+
+    def test_export_members(self):
+        # Only the addresses are exported by default, without a header.
+        self.client.login(username='testowner', password='testpass')
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="Subscribers.csv"')
+        self.assertEqual(
+            sorted(self._get_rows(response)),
+            ['member-{}@example.com'.format(i) for i in range(5)])
+
+    @override_settings(POSTORIUS_CSV_EXPORT_PAGE_SIZE=2)
+    def test_export_all_pages(self):
+        self.client.login(username='testowner', password='testpass')
+        response = self.client.get(self.url)
+        self.assertEqual(
+            sorted(self._get_rows(response)),
+            ['member-{}@example.com'.format(i) for i in range(5)])
+
+    def test_export_fields(self):
+        # A header row names the exported columns.
+        self.client.login(username='testowner', password='testpass')
+        response = self.client.get(
+            self.url, {'fields': 'email,display_name,role'})
+        rows = self._get_rows(response)
+        self.assertEqual(rows[0], 'email,display_name,role')
+        self.assertEqual(
+            sorted(rows[1:]),
+            ['member-{0}@example.com,Member {0},member'.format(i)
+             for i in range(5)])
+
+    def test_export_role(self):
+        self.client.login(username='testowner', password='testpass')
+        response = self.client.get(self.url, {'role': 'moderator'})
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="Moderators.csv"')
+        self.assertEqual(self._get_rows(response), ['moderator@example.com'])
+
+    def test_invalid_role(self):
+        self.client.login(username='testowner', password='testpass')
+        response = self.client.get(self.url, {'role': 'nobody'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_field(self):
+        self.client.login(username='testowner', password='testpass')
+        response = self.client.get(
+            self.url, {'fields': 'email,password'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_accessible_for_non_owners(self):
+        # Anonymous users are asked to log in.
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('account_login'), response['Location'])
+        for username in ('testuser', 'testmoderator'):
+            self.client.login(username=username, password='testpass')
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 403)
@@ -23,7 +23,7 @@ from django.urls import reverse
 from django.utils import six
 
 from postorius.views.list import SETTINGS_FORMS
-from postorius.models import List
+from postorius.models import List, MembershipJob
 from postorius.tests.utils import ViewTestCase
 
 
@@ -103,6 +103,21 @@ class ListSettingsTest(ViewTestCase):
         m_list = List.objects.get(fqdn_listname='foo.example.com')
         self.assertEqual(m_list.settings['archive_policy'], 'private')
 
+    def test_settings_not_stale_after_edit(self):
+        # The settings are cached between requests, the page shows the new
+        # ones right after they are changed.
+        self.client.login(username='testsu', password='testpass')
+        url = reverse('list_settings', args=('foo.example.com', 'archiving'))
+        for i in range(2):
+            response = self.client.get(url)
+            self.assertEqual(
+                response.context["form"].initial['archive_policy'], 'public')
+        response = self.client.post(url, {'archive_policy': 'private'})
+        self.assertRedirects(response, url)
+        response = self.client.get(url)
+        self.assertEqual(
+            response.context["form"].initial['archive_policy'], 'private')
+
     def test_archivers(self):
         self.assertEqual(dict(self.foo_list.archivers),
                          {'mhonarc': True, 'prototype': True,
@@ -217,6 +232,11 @@ class ListSettingsTest(ViewTestCase):
         self.assertContains(response, '<small>(3)</small>')
         # Verify that the list is paginated
         self.assertContains(response, '<div class="paginator">')
+        # Moderating without selecting a request shows an error.
+        response = self.client.post(url, {'accept': 'Accept'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Make at least one selection')
+        self.assertContains(response, '<small>(3)</small>')
 
     def test_handle_subscription_request(self):
         self.client.login(username='testowner', password='testpass')
@@ -252,7 +272,15 @@ class ListSettingsTest(ViewTestCase):
         # If we POST to the above url, we will unsubscribe all the users.
         self.assertEqual(len(self.foo_list.members), 10)
         # Now, let's remove all the subscribers
-        self.client.post(url)
+        response = self.client.post(url)
+        job = MembershipJob.objects.get()
+        self.assertRedirects(
+            response, reverse('membership_job',
+                              args=('foo.example.com', job.pk)),
+            fetch_redirect_response=False)
+        self.assertEqual(job.status, MembershipJob.DONE)
+        self.assertEqual(job.total, 10)
+        self.assertEqual(job.processed, 10)
         self.assertEqual(len(self.foo_list.members), 0)
 
     def test_message_acceptance(self):
@@ -22,6 +22,8 @@ import mock
 from django.urls import reverse
 from django.test import TestCase, RequestFactory
 
+from postorius import utils
+from postorius.middleware import PostoriusMiddleware
 from postorius.models import MailmanApiError
 from mailmanclient import MailmanConnectionError
 
@@ -48,3 +50,14 @@ class TestMiddleware(TestCase):
         response = self.client.get(reverse('list_index'))
         self.assertEqual('Mailman REST API not available. Please start Mailman core.',    # noqa
                          response.context['error'])
+
+    def test_request_cache_lifetime(self):
+        # The REST response cache is only active while handling the request.
+        def get_response(request):
+            self.assertIs(utils.get_request_cache(), request.mailman_cache)
+            return 'response'
+        request = self.factory.get('/postorius/lists')
+        middleware = PostoriusMiddleware(get_response)
+        self.assertEqual(middleware(request), 'response')
+        self.assertIsNotNone(request.mailman_cache)
+        self.assertIsNone(utils.get_request_cache())
@@ -24,7 +24,7 @@ from django.test import override_settings
 
 from postorius.tests.utils import ViewTestCase
 from postorius.models import (
-    MailmanApiError, MailmanListManager, MailmanUserManager)
+    CoreUpdate, MailmanApiError, MailmanListManager, MailmanUserManager)
 
 
 class ModelTest(ViewTestCase):
@@ -54,17 +54,19 @@ class ModelTest(ViewTestCase):
         self.assertEqual(str(mm_user.addresses[0]), 'test@example.com')
 
     @override_settings(AUTOCREATE_MAILMAN_USER=True)
-    @patch('postorius.models.MailmanUser')
+    @patch('postorius.outbox.MailmanUser')
     def test_core_not_reachable(self, mock_model):
         # Fail Gracefully if the Core is not reachable when
         # creating the user account.
-        mock_model.objects.create_from_django.side_effect = MailmanApiError
+        mock_model.objects.get.side_effect = MailmanApiError
         # User creation should succeed without any error, even though there
-        # is no MailmanUser. However, this error should be logged.
-        with patch('postorius.models.logger') as log:
-            User.objects.create_user('testuser, test@example.com', 'testpass')
-            errmsg = 'Mailman Core API is not reachable.'
-            log.error.assert_called_with(errmsg)
+        # is no MailmanUser. However, this error should be logged and the
+        # creation retried later.
+        with patch('postorius.outbox.logger') as log:
+            User.objects.create_user(
+                'testuser', 'test@example.com', 'testpass')
+            self.assertTrue(log.warning.called)
+        self.assertEqual(CoreUpdate.objects.get().attempts, 1)
         # There should be no user in Mailman with this address.
         with self.assertRaises(HTTPError):
             self.mm_client.get_user('test@example.com')
@@ -126,7 +128,10 @@ class TestMailmanUserManager(ViewTestCase):
                          ['bob@example.com'])
 
     def test_get_or_create_from_django(self):
-        self.user_manager.create_from_django = MagicMock(name='create')
+        # The created user is linked to the Django user.
+        self.user_manager.create_from_django = MagicMock(
+            name='create', return_value=MagicMock(
+                user_id=1234, self_link='http://localhost:9001/users/1234'))
         muser = self.user_manager.get_or_create_from_django(self.bob)
         self.assertIsNotNone(muser)
         self.user_manager.create_from_django.assert_called_once()
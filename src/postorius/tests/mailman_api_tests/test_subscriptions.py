@@ -21,6 +21,7 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 from mock import patch
 
+from postorius.models import MembershipJob
 from postorius.tests.utils import ViewTestCase
 
 
@@ -176,9 +177,17 @@ class TestSubscription(ViewTestCase):
                         test-3@example.org (Third Person)\n
                         test-4@example.org\n
                         <test-5@example.org>\n"""
-        self.client.post(
+        response = self.client.post(
             reverse('mass_subscribe', args=('open_list.example.com',)),
             {'emails': email_list})
+        job = MembershipJob.objects.get()
+        self.assertRedirects(
+            response, reverse('membership_job',
+                              args=('open_list.example.com', job.pk)),
+            fetch_redirect_response=False)
+        self.assertEqual(job.status, MembershipJob.DONE)
+        self.assertEqual(job.processed, 5)
+        self.assertEqual(job.results.filter(status='success').count(), 5)
         self.assertEqual(len(self.open_list.members), 5)
         first = self.open_list.get_member('test-1@example.org')
         second = self.open_list.get_member('test-2@example.org')
@@ -212,6 +221,18 @@ class TestSubscription(ViewTestCase):
             response, reverse('list_summary',
                               args=('open_list.example.com', )))
 
+    def test_change_subscription_not_subscribed(self):
+        # Only an existing subscription can be changed.
+        self.client.login(username='testuser', password='pwd')
+        response = self.client.post(
+            reverse('change_subscription', args=['open_list.example.com']),
+            {'email': 'fritz@example.org'})
+        self.assertHasErrorMessage(response)
+        self.assertEqual(len(self.open_list.members), 0)
+        self.assertRedirects(
+            response, reverse('list_summary',
+                              args=('open_list.example.com', )))
+
     def test_change_subscription_confirm(self):
         # The subscription is changed from an address to another
         confirm_list = self.domain.create_list('confirm_list')
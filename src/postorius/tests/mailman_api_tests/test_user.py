@@ -63,6 +63,28 @@ class MailmanUserTest(ViewTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.context["formset"]), 3)
 
+    def test_address_based_preferences_inherited(self):
+        self.client.login(username='user', password='testpass')
+        self.mm_user.preferences['delivery_mode'] = 'plaintext_digests'
+        self.mm_user.preferences.save()
+        url = reverse('user_address_preferences')
+        response = self.client.get(url)
+        form = response.context['formset'].forms[0]
+        self.assertEqual(form.initial['delivery_mode'], 'plaintext_digests')
+        self.assertEqual(form.initial['delivery_status'], 'enabled')
+        # Only the changed preferences are set on the address.
+        response = self.client.post(url, {
+            'form-TOTAL_FORMS': '1', 'form-INITIAL_FORMS': '1',
+            'form-MIN_NUM_FORMS': '0', 'form-MAX_NUM_FORMS': '1000',
+            'form-0-delivery_mode': 'mime_digests',
+            'form-0-delivery_status': 'enabled',
+            })
+        self.assertRedirects(response, url)
+        address = self.mm_client.get_address('user@example.com')
+        self.assertEqual(address.preferences['delivery_mode'],
+                         'mime_digests')
+        self.assertNotIn('delivery_status', dict(address.preferences))
+
     # this test needs re-thinking with the way we've hacked preferences
     # it has been disabled for now
     # def test_preferences_none(self):
@@ -142,6 +164,9 @@ class MailmanUserTest(ViewTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsNotNone(response.context['formset'])
         self.assertEqual(len(response.context['formset']), 1)
+        # Only the values set on the subscription are shown.
+        self.assertIsNone(
+            response.context['formset'].forms[0].initial.get('delivery_mode'))
 
     def test_presence_of_form_in_user_list_options(self):
         self.client.login(username='user', password='testpass')
@@ -26,7 +26,9 @@ from mock import patch
 from postorius.auth.decorators import (list_owner_required,
                                        list_moderator_required,
                                        superuser_required)
+from postorius.auth.utils import user_is_in_list_roster
 from postorius.tests.utils import create_mock_list
+from postorius.utils import begin_request_cache, end_request_cache
 from mailmanclient import Client
 
 
@@ -53,10 +55,14 @@ def create_user():
     return user
 
 
-class MockMember():
-
-    def __init__(self, email):
-        self.email = email
+def find_lists_with_roles(mlist, roles):
+    """Return a fake Client.find_lists, which finds `mlist` for the given
+    (address, role) pairs."""
+    def find_lists(address, role=None, count=50, page=1):
+        if page == 1 and (address, role) in roles:
+            return [mlist]
+        return []
+    return find_lists
 
 
 class ListOwnerRequiredTest(TestCase):
@@ -96,11 +102,13 @@ class ListOwnerRequiredTest(TestCase):
             request, list_id='foolist.example.org')
         self.assertEqual(return_value, True)
 
+    @patch.object(Client, 'find_lists')
     @patch.object(Client, 'get_list')
-    def test_non_list_owner(self, mock_get_list):
+    def test_non_list_owner(self, mock_get_list, mock_find_lists):
         """Should raise PermissionDenied if user is not a list owner."""
         # prepare mock list object
-        self.mock_list.owners = [MockMember('geddy@rush.it')]
+        mock_find_lists.side_effect = find_lists_with_roles(
+            self.mock_list, {('geddy@rush.it', 'owner')})
         mock_get_list.return_value = self.mock_list
         # prepare request
         request = self.request_factory.get(
@@ -109,11 +117,13 @@ class ListOwnerRequiredTest(TestCase):
         self.assertRaises(PermissionDenied, dummy_function, request,
                           list_id='foolist.example.org')
 
+    @patch.object(Client, 'find_lists')
     @patch.object(Client, 'get_list')
-    def test_list_owner(self, mock_get_list):
+    def test_list_owner(self, mock_get_list, mock_find_lists):
         """Should return fn return value if user is the list owner."""
         # prepare mock list object
-        self.mock_list.owners = [MockMember('les@primus.org')]
+        mock_find_lists.side_effect = find_lists_with_roles(
+            self.mock_list, {('les@primus.org', 'owner')})
         mock_get_list.return_value = self.mock_list
         # prepare request
         request = self.request_factory.get(
@@ -123,6 +133,23 @@ class ListOwnerRequiredTest(TestCase):
             request, list_id='foolist.example.org')
         self.assertEqual(return_value, True)
 
+    @patch.object(Client, 'find_lists')
+    @patch.object(Client, 'get_list')
+    def test_roles_looked_up_once_per_request(self, mock_get_list,
+                                              mock_find_lists):
+        """The lists of a user are only searched once per web request."""
+        mock_find_lists.side_effect = find_lists_with_roles(
+            self.mock_list, set())
+        mock_get_list.return_value = self.mock_list
+        user = create_user()
+        begin_request_cache()
+        self.addCleanup(end_request_cache)
+        for i in range(3):
+            self.assertFalse(user_is_in_list_roster(
+                user, self.mock_list, 'owners'))
+        mock_find_lists.assert_called_once_with(
+            'les@primus.org', role='owner', count=500, page=1)
+
 
 class ListModeratorRequiredTest(TestCase):
     """Tests the list_owner_required auth decorator."""
@@ -161,11 +188,13 @@ class ListModeratorRequiredTest(TestCase):
             request, list_id='foolist.example.org')
         self.assertEqual(return_value, True)
 
+    @patch.object(Client, 'find_lists')
     @patch.object(Client, 'get_list')
-    def test_non_list_moderator(self, mock_get_list):
+    def test_non_list_moderator(self, mock_get_list, mock_find_lists):
         """Should raise PermissionDenied if user is not a list owner."""
         # prepare mock list object
-        self.mock_list.moderators = [MockMember('geddy@rush.it')]
+        mock_find_lists.side_effect = find_lists_with_roles(
+            self.mock_list, {('geddy@rush.it', 'moderator')})
         mock_get_list.return_value = self.mock_list
         # prepare request
         request = self.request_factory.get(
@@ -174,11 +203,13 @@ class ListModeratorRequiredTest(TestCase):
         self.assertRaises(PermissionDenied, dummy_function_mod_req, request,
                           list_id='foolist.example.org')
 
+    @patch.object(Client, 'find_lists')
     @patch.object(Client, 'get_list')
-    def test_list_owner(self, mock_get_list):
+    def test_list_owner(self, mock_get_list, mock_find_lists):
         """Should return fn return value if user is the list owner."""
         # prepare mock list object
-        self.mock_list.owners = [MockMember('les@primus.org')]
+        mock_find_lists.side_effect = find_lists_with_roles(
+            self.mock_list, {('les@primus.org', 'owner')})
         mock_get_list.return_value = self.mock_list
         # prepare request
         request = self.request_factory.get(
@@ -188,11 +219,13 @@ class ListModeratorRequiredTest(TestCase):
             request, list_id='foolist.example.org')
         self.assertEqual(return_value, True)
 
+    @patch.object(Client, 'find_lists')
     @patch.object(Client, 'get_list')
-    def test_list_moderator(self, mock_get_list):
+    def test_list_moderator(self, mock_get_list, mock_find_lists):
         """Should return fn return value if user is the list moderator."""
         # prepare mock list object
-        self.mock_list.moderators = [MockMember('les@primus.org')]
+        mock_find_lists.side_effect = find_lists_with_roles(
+            self.mock_list, {('les@primus.org', 'moderator')})
         mock_get_list.return_value = self.mock_list
         # prepare request
         request = self.request_factory.get(
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from mailmanclient import Client
+from django.test import TestCase, override_settings
+from django.utils.six.moves.urllib.error import HTTPError
+
+from postorius.models import Domain, List, MailmanCache, Member
+from postorius.tests.utils import get_test_file
+from postorius.utils import MailmanConnection
+from postorius.views.rest import render_held_message
+from postorius.views.user import MergedPreferences, PreferencesResolver
+
+
+@override_settings(POSTORIUS_CACHE_ALIAS='default')
+class TestMailmanCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.mailman_cache = MailmanCache()
+
+    def test_get_set(self):
+        self.assertIsNone(self.mailman_cache.get('domains', 'domains', 'x'))
+        self.mailman_cache.set('domains', 'domains', 'x', {'foo': 'bar'})
+        self.assertEqual(self.mailman_cache.get('domains', 'domains', 'x'),
+                         {'foo': 'bar'})
+
+    def test_invalidate_scope(self):
+        self.mailman_cache.set('list_settings', 'list:a', 'x', 1)
+        self.mailman_cache.set('list_settings', 'list:b', 'x', 2)
+        self.mailman_cache.invalidate('list:a')
+        self.assertIsNone(self.mailman_cache.get('list_settings', 'list:a',
+                                                 'x'))
+        self.assertEqual(self.mailman_cache.get('list_settings', 'list:b',
+                                                'x'), 2)
+
+    @override_settings(POSTORIUS_CACHE_TIMEOUTS={'domains': 0})
+    def test_zero_timeout_disables_caching(self):
+        self.mailman_cache.set('domains', 'domains', 'x', 1)
+        self.assertIsNone(self.mailman_cache.get('domains', 'domains', 'x'))
+
+    @override_settings(POSTORIUS_CACHE_ALIAS=None)
+    def test_disabled_without_alias(self):
+        # A cache local to each process would serve stale data after another
+        # process changed it, it has to be configured explicitly.
+        self.mailman_cache.set('domains', 'domains', 'x', 1)
+        self.mailman_cache.invalidate('domains')
+        self.assertIsNone(self.mailman_cache.get('domains', 'domains', 'x'))
+
+    def test_resources(self):
+        self.mailman_cache.set_resource('lists/foo@example.com/config', 1)
+        self.mailman_cache.set_resource('lists/foo.example.com/archivers', 2)
+        self.mailman_cache.set_resource('lists/foo.example.com/roster/member',
+                                        3)
+        self.assertEqual(self.mailman_cache.get_resource(
+            'lists/foo@example.com/config'), 1)
+        self.assertEqual(self.mailman_cache.get_resource(
+            'lists/foo.example.com/archivers'), 2)
+        self.assertIsNone(self.mailman_cache.get_resource(
+            'lists/foo.example.com/roster/member'))
+        # Both ways to address a list share the same scope.
+        self.mailman_cache.invalidate('list:foo.example.com')
+        self.assertIsNone(self.mailman_cache.get_resource(
+            'lists/foo@example.com/config'))
+
+    def test_resources_per_api_version(self):
+        self.mailman_cache.set_resource('lists/styles', 1, api_version='3.0')
+        self.assertEqual(self.mailman_cache.get_resource(
+            'lists/styles', api_version='3.0'), 1)
+        self.assertIsNone(self.mailman_cache.get_resource(
+            'lists/styles', api_version='3.1'))
+
+
+@override_settings(POSTORIUS_CACHE_ALIAS='default')
+class TestSharedResponseCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.connection = MailmanConnection(
+            'http://localhost:9001/3.1', 'restadmin', 'restpass')
+        patcher = mock.patch('httplib2.Http.request')
+        self.http_request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.http_request.return_value = (
+            mock.Mock(status=200), b'{"entries": []}')
+
+    def test_cached_between_requests(self):
+        self.connection.call('domains')
+        response, content = self.connection.call('domains')
+        self.assertEqual(content, {'entries': []})
+        self.assertEqual(self.http_request.call_count, 1)
+        Domain.objects.invalidate_cache()
+        self.connection.call('domains')
+        self.assertEqual(self.http_request.call_count, 2)
+
+    def test_list_settings_invalidation(self):
+        self.connection.call('lists/foo@example.com/config')
+        self.connection.call('lists/foo@example.com/config')
+        self.assertEqual(self.http_request.call_count, 1)
+        List.objects.invalidate_cache('foo.example.com')
+        self.connection.call('lists/foo@example.com/config')
+        self.assertEqual(self.http_request.call_count, 2)
+
+    def test_memberships_by_subscriber(self):
+        data = {'subscriber': 'Anne@example.com', 'role': 'member'}
+        self.connection.call('lists/find', data)
+        self.connection.call('lists/find', data)
+        self.assertEqual(self.http_request.call_count, 1)
+        # Searches without a subscriber are not cached.
+        self.connection.call('members/find', {'list_id': 'foo.example.com'})
+        self.connection.call('members/find', {'list_id': 'foo.example.com'})
+        self.assertEqual(self.http_request.call_count, 3)
+        Member.objects.invalidate_cache('anne@example.com')
+        self.connection.call('lists/find', data)
+        self.assertEqual(self.http_request.call_count, 4)
+
+    def test_searches_without_results_cached(self):
+        # Core answers with a 404 when nothing matches.
+        self.http_request.return_value = (
+            mock.Mock(status=404), b'{"title": "404 Not Found"}')
+        data = {'subscriber': 'anne@example.com', 'role': 'owner'}
+        response, content = self.connection.call('lists/find', data)
+        self.assertEqual(content, {'start': 0, 'total_size': 0})
+        self.connection.call('lists/find', data)
+        self.assertEqual(self.http_request.call_count, 1)
+        # Other missing resources are still errors.
+        with self.assertRaises(HTTPError):
+            self.connection.call('lists/foo@example.com/config')
+
+    def test_memberships_by_address_object(self):
+        # mailmanclient's User.subscriptions searches by Address object.
+        address = mock.MagicMock()
+        address.__str__.return_value = 'Anne@example.com'
+        self.connection.call('members/find', {'subscriber': address})
+        self.connection.call('members/find', {'subscriber': address})
+        self.assertEqual(self.http_request.call_count, 1)
+        Member.objects.invalidate_cache('anne@example.com')
+        self.connection.call('members/find', {'subscriber': address})
+        self.assertEqual(self.http_request.call_count, 2)
+
+    def test_system_preferences(self):
+        self.connection.call('system/preferences')
+        self.connection.call('system/preferences')
+        self.assertEqual(self.http_request.call_count, 1)
+        call_command('flush_mailman_cache', 'system', stdout=mock.Mock())
+        self.connection.call('system/preferences')
+        self.assertEqual(self.http_request.call_count, 2)
+
+    def test_other_resources_not_cached(self):
+        self.connection.call('lists/foo@example.com/roster/member')
+        self.connection.call('lists/foo@example.com/roster/member')
+        self.assertEqual(self.http_request.call_count, 2)
+
+
+class TestPreferencesResolver(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('postorius.views.user.get_mailman_client')
+        self.client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.return_value.preferences = {
+            'self_link': 'system', 'delivery_mode': 'regular',
+            'receive_own_postings': True, 'hide_address': True}
+        self.user = mock.Mock(preferences={
+            'self_link': 'user', 'receive_own_postings': False})
+        self.resolver = PreferencesResolver(self.user)
+
+    def test_layers(self):
+        address = mock.Mock(preferences={'delivery_mode': 'plaintext_digests'})
+        subscription = mock.Mock(preferences={'hide_address': False})
+        self.assertEqual(
+            self.resolver.for_subscription(subscription, address.preferences),
+            {'delivery_mode': 'plaintext_digests',
+             'receive_own_postings': False, 'hide_address': False})
+        self.assertEqual(self.resolver.for_address(address)['hide_address'],
+                         True)
+
+    def test_for_subscriptions(self):
+        anne = mock.Mock(email='anne@example.com',
+                         preferences={'delivery_mode': 'mime_digests'})
+        bart = mock.Mock(email='bart@example.com', preferences={})
+        unused = mock.Mock(email='unused@example.com')
+        type(unused).preferences = mock.PropertyMock()
+        self.user.addresses = [anne, bart, unused]
+        subscriptions = [
+            mock.Mock(email='anne@example.com', preferences={}),
+            mock.Mock(email='anne@example.com',
+                      preferences={'delivery_mode': 'regular'}),
+            mock.Mock(email='bart@example.com', preferences={}),
+        ]
+        self.assertEqual(
+            [prefs['delivery_mode']
+             for prefs in self.resolver.for_subscriptions(subscriptions)],
+            ['mime_digests', 'regular', 'regular'])
+        # Addresses without subscriptions aren't fetched.
+        self.assertFalse(type(unused).preferences.called)
+
+    def test_defaults_fetched_once(self):
+        for i in range(3):
+            self.resolver.resolve()
+        self.assertEqual(self.client.call_count, 1)
+
+
+class TestMergedPreferences(TestCase):
+
+    def setUp(self):
+        self.preferences = mock.MagicMock()
+        self.merged = MergedPreferences(
+            self.preferences,
+            {'delivery_mode': 'regular', 'hide_address': True})
+
+    def test_read_only(self):
+        self.assertEqual(dict(self.merged),
+                         {'delivery_mode': 'regular', 'hide_address': True})
+        self.merged.save()
+        self.assertFalse(self.preferences.save.called)
+        self.assertFalse(self.preferences.__setitem__.called)
+
+    def test_only_changed_keys_saved(self):
+        self.merged['delivery_mode'] = 'regular'
+        self.merged['hide_address'] = False
+        self.assertEqual(self.merged['hide_address'], False)
+        self.assertEqual(self.merged.changed, {'hide_address': False})
+        self.merged.save()
+        self.preferences.__setitem__.assert_called_once_with(
+            'hide_address', False)
+        self.preferences.save.assert_called_once_with()
+        self.assertEqual(self.merged.changed, {})
+
+
+@override_settings(POSTORIUS_CACHE_ALIAS='default')
+class TestDomainOwnerAddresses(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        owner = mock.MagicMock()
+        owner.addresses = [mock.MagicMock(email='anne@example.com'),
+                           mock.MagicMock(email='anne@example.org')]
+        self.domain = mock.MagicMock(owners=[owner])
+
+    @mock.patch.object(Client, 'get_domain')
+    def test_owner_addresses_cached(self, mock_get_domain):
+        mock_get_domain.return_value = self.domain
+        expected = {'anne@example.com', 'anne@example.org'}
+        self.assertEqual(Domain.objects.get_owner_addresses('example.com'),
+                         expected)
+        self.assertEqual(Domain.objects.get_owner_addresses('example.com'),
+                         expected)
+        self.assertEqual(mock_get_domain.call_count, 1)
+        Domain.objects.invalidate_cache()
+        Domain.objects.get_owner_addresses('example.com')
+        self.assertEqual(mock_get_domain.call_count, 2)
+
+
+@override_settings(POSTORIUS_CACHE_ALIAS='default')
+class TestHeldMessageRendering(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with open(get_test_file('test-email-attachment.txt')) as fp:
+            raw = fp.read()
+        self.mlist = mock.Mock(list_id='foo.example.com')
+        self.mlist.get_held_message.return_value = mock.Mock(
+            sender='bob@example.com', subject='Hello', reason='Non-member',
+            hold_date='2019-01-01T00:00:00', request_id=1, msg=raw)
+
+    def test_rendered_once(self):
+        rendered = render_held_message(self.mlist, 1)
+        self.assertEqual(rendered['subject'], 'Hello')
+        self.assertEqual(len(rendered['attachments']), 1)
+        name, content_type, content = list(
+            rendered['attachments'].values())[0]
+        self.assertEqual(name, 'signature.asc')
+        self.assertEqual(render_held_message(self.mlist, '1'), rendered)
+        self.assertEqual(self.mlist.get_held_message.call_count, 1)
+
+    def test_forgotten_when_moderated(self):
+        render_held_message(self.mlist, 1)
+        List.objects.forget_held_message('foo.example.com', 1)
+        render_held_message(self.mlist, 1)
+        self.assertEqual(self.mlist.get_held_message.call_count, 2)
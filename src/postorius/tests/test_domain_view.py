@@ -18,10 +18,14 @@
 
 from allauth.account.models import EmailAddress
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django_mailman3.models import MailDomain
 
 from postorius.forms import DomainForm
+from postorius.models import Domain
 
 
 class DomainViewTest(TestCase):
@@ -40,3 +44,31 @@ class DomainViewTest(TestCase):
         response = self.client.get(reverse('domain_new'), follow=True)
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response.context['form'], DomainForm)
+
+
+@override_settings(POSTORIUS_CACHE_ALIAS='default')
+class DomainSitesTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.site = Site.objects.get_current()
+        self.other_site = Site.objects.create(
+            domain='other.example.org', name='Other')
+        MailDomain.objects.create(
+            site=self.other_site, mail_domain='example.org')
+
+    def test_constant_queries(self):
+        mail_hosts = ['example.org'] + [
+            'example{}.com'.format(i) for i in range(20)]
+        # One query for the existing MailDomains, one to create the others.
+        with self.assertNumQueries(2):
+            sites = Domain.objects.get_sites(mail_hosts, self.site)
+        self.assertEqual(sites['example.org'], self.other_site)
+        self.assertEqual(sites['example5.com'], self.site)
+        self.assertEqual(MailDomain.objects.count(), 21)
+        # Then the map is cached until the domains change.
+        with self.assertNumQueries(0):
+            Domain.objects.get_sites(mail_hosts, self.site)
+        Domain.objects.invalidate_cache()
+        with self.assertNumQueries(1):
+            Domain.objects.get_sites(mail_hosts, self.site)
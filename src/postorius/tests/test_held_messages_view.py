@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+import mock
+from allauth.account.models import EmailAddress
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from postorius.models import BulkModerationResult, List, mailman_cache
+
+
+class TestModerateAllMatching(TestCase):
+
+    def setUp(self):
+        mailman_cache.cache.clear()
+        user = User.objects.create_superuser('su', 'su@example.com', 'pass')
+        EmailAddress.objects.create(
+            user=user, email=user.email, verified=True)
+        self.client.login(username='su', password='pass')
+        self.mlist = mock.Mock(list_id='foo.example.com',
+                               fqdn_listname='foo@example.com')
+        self.held = [
+            mock.Mock(request_id=request_id, sender='spam@example.com',
+                      subject='Buy now', reason='Non-member post',
+                      hold_date=None, msg='Subject: Buy now\n\nText')
+            for request_id in (1, 2)]
+        for name, kwargs in (
+                ('get_or_404', dict(return_value=self.mlist)),
+                ('find_held_messages', dict(return_value=self.held)),
+                ('bulk_moderate', dict(
+                    return_value=BulkModerationResult(['1', '2'], {})))):
+            patcher = mock.patch.object(List.objects, name, **kwargs)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.mlist.get_held_message.side_effect = (
+            lambda held_id: self.held[held_id - 1])
+        self.url = '{}?sender=spam'.format(
+            reverse('list_held_messages', args=['foo.example.com']))
+
+    def test_confirmation_asked(self):
+        response = self.client.post(
+            self.url, {'all_matching': '1', 'discard': 'Discard all'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(
+            response, 'postorius/lists/confirm_moderate_all.html')
+        self.assertEqual(response.context['count'], 2)
+        self.assertContains(response, 'discard the 2 messages')
+        self.assertFalse(self.bulk_moderate.called)
+
+    def test_confirmed(self):
+        response = self.client.post(
+            self.url, {'all_matching': '1', 'confirmed': '1',
+                       'discard': 'Discard all'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(
+            response, 'postorius/lists/held_messages.html')
+        self.bulk_moderate.assert_called_once_with(
+            self.mlist, [1, 2], 'discard')
+        self.find_held_messages.assert_called_with(
+            self.mlist, sender='spam')
+
+    def test_filtered_page(self):
+        response = self.client.get(self.url + '&count=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [held.request_id for held in response.context['held_messages']],
+            [1])
+        self.mlist.get_held_message.assert_called_once_with(1)
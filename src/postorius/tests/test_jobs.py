@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import timedelta
+
+import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.six.moves.urllib.error import HTTPError
+from mailmanclient import MailmanConnectionError
+
+from postorius import jobs
+from postorius.models import List, MembershipJob, MembershipJobResult
+
+
+@override_settings(POSTORIUS_JOB_BATCH_SIZE=2, POSTORIUS_REST_CONCURRENCY=1)
+class TestMembershipJobs(TestCase):
+
+    def setUp(self):
+        self.mlist = mock.Mock()
+        self.mlist.list_id = 'foo.example.com'
+        self.mlist.fqdn_listname = 'foo@example.com'
+        patcher = mock.patch.object(List.objects, 'get',
+                                    return_value=self.mlist)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_create_subscribe_job(self):
+        job = jobs.create_subscribe_job(
+            self.mlist, ['Jane Doe <jane@example.com>', 'invalid'])
+        self.assertEqual(job.status, MembershipJob.PENDING)
+        self.assertEqual(job.total, 2)
+        self.assertEqual(job.processed, 1)
+        jane, invalid = job.results.all()
+        self.assertEqual(jane.address, 'jane@example.com')
+        self.assertEqual(jane.display_name, 'Jane Doe')
+        self.assertEqual(jane.status, MembershipJobResult.PENDING)
+        self.assertEqual(invalid.status, MembershipJobResult.ERROR)
+        self.assertEqual(invalid.message,
+                         'The email address invalid is not valid.')
+
+    def test_create_subscribe_job_long_entries(self):
+        long_address = '{}@example.com'.format('a' * 250)
+        job = jobs.create_subscribe_job(
+            self.mlist, ['{} <{}>'.format('J' * 300, long_address),
+                         'x' * 300])
+        self.assertEqual(job.processed, 2)
+        for result in job.results.all():
+            self.assertEqual(result.status, MembershipJobResult.ERROR)
+            self.assertLessEqual(len(result.address), 255)
+            self.assertLessEqual(len(result.display_name), 255)
+
+    def test_run_job(self):
+        def subscribe(address, **kw):
+            if address == 'b@example.com':
+                raise HTTPError('url', 409, b'Member already subscribed',
+                                None, None)
+        self.mlist.subscribe.side_effect = subscribe
+        job = jobs.create_subscribe_job(
+            self.mlist, ['a@example.com', 'b@example.com', 'c@example.com'])
+        job = jobs.run_job(job.pk)
+        self.assertEqual(job.status, MembershipJob.DONE)
+        self.assertEqual(job.processed, 3)
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(self.mlist.subscribe.call_count, 3)
+        statuses = dict(job.results.values_list('address', 'status'))
+        self.assertEqual(statuses, {
+            'a@example.com': MembershipJobResult.SUCCESS,
+            'b@example.com': MembershipJobResult.ERROR,
+            'c@example.com': MembershipJobResult.SUCCESS})
+        self.assertEqual(
+            job.results.get(address='b@example.com').message,
+            'Member already subscribed')
+
+    def test_run_job_only_once(self):
+        job = jobs.create_subscribe_job(self.mlist, ['a@example.com'])
+        jobs.run_job(job.pk)
+        self.assertIsNone(jobs.run_job(job.pk))
+        self.assertEqual(self.mlist.subscribe.call_count, 1)
+
+    def test_resume_interrupted_job(self):
+        calls = []
+
+        def subscribe(address, **kw):
+            calls.append(address)
+            if address == 'c@example.com' and calls.count(address) == 1:
+                raise MailmanConnectionError('Could not connect')
+        self.mlist.subscribe.side_effect = subscribe
+        job = jobs.create_subscribe_job(
+            self.mlist, ['a@example.com', 'b@example.com', 'c@example.com'])
+        job = jobs.run_job(job.pk)
+        # The first batch was saved, the second one stays pending.
+        self.assertEqual(job.status, MembershipJob.FAILED)
+        self.assertEqual(job.processed, 2)
+        self.assertIn('Could not connect', job.error)
+        self.assertIsNone(jobs.run_job(job.pk))
+        job = jobs.run_job(job.pk, resume=True)
+        self.assertEqual(job.status, MembershipJob.DONE)
+        self.assertEqual(job.processed, 3)
+        self.assertEqual(job.error, '')
+        self.assertEqual(calls, ['a@example.com', 'b@example.com',
+                                 'c@example.com', 'c@example.com'])
+
+    def test_running_job_resumed_once_stale(self):
+        job = jobs.create_subscribe_job(self.mlist, ['a@example.com'])
+        self.assertTrue(jobs.claim_job(job.pk))
+        # Another worker is still processing it.
+        self.assertIsNone(jobs.run_job(job.pk, resume=True))
+        MembershipJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(
+                seconds=jobs.STALE_JOB_TIMEOUT + 1))
+        job = jobs.run_job(job.pk, resume=True)
+        self.assertEqual(job.status, MembershipJob.DONE)
+        self.assertEqual(self.mlist.subscribe.call_count, 1)
+
+    @override_settings(POSTORIUS_JOB_RUNNER='command')
+    def test_schedule_job_command(self):
+        job = jobs.create_subscribe_job(self.mlist, ['a@example.com'])
+        jobs.schedule_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, MembershipJob.PENDING)
+        self.assertFalse(self.mlist.subscribe.called)
+
+    def _roster(self, addresses):
+        def get_member_page(count, page):
+            members = addresses[(page - 1) * count:page * count]
+            roster = mock.MagicMock()
+            roster.__iter__.return_value = [
+                mock.Mock(email=address) for address in members]
+            roster.total_size = len(addresses)
+            roster.has_next = page * count < len(addresses)
+            return roster
+        self.mlist.get_member_page.side_effect = get_member_page
+
+    def test_unsubscribe_all(self):
+        addresses = ['{}@example.com'.format(i) for i in range(5)]
+        self._roster(addresses)
+        job = jobs.create_unsubscribe_all_job(self.mlist)
+        self.assertEqual(job.total, 5)
+        self.assertEqual(job.cursor, 1)
+        job = jobs.run_job(job.pk)
+        self.assertEqual(job.status, MembershipJob.DONE)
+        self.assertIsNone(job.cursor)
+        self.assertEqual(job.processed, 5)
+        self.assertEqual(
+            [call[0][0] for call in self.mlist.unsubscribe.call_args_list],
+            addresses)
+
+    def test_unsubscribe_all_resumes_collection(self):
+        addresses = ['{}@example.com'.format(i) for i in range(5)]
+        self._roster(addresses)
+        job = jobs.create_unsubscribe_all_job(self.mlist)
+        # The worker stopped after collecting the first page.
+        MembershipJobResult.objects.bulk_create([
+            MembershipJobResult(job=job, address=address)
+            for address in addresses[:2]])
+        MembershipJob.objects.filter(pk=job.pk).update(
+            cursor=2, status=MembershipJob.RUNNING,
+            updated_at=timezone.now() - timedelta(
+                seconds=jobs.STALE_JOB_TIMEOUT + 1))
+        job = jobs.run_job(job.pk, resume=True)
+        self.assertEqual(job.status, MembershipJob.DONE)
+        self.assertEqual(job.total, 5)
+        self.assertEqual(
+            sorted(job.results.values_list('address', flat=True)), addresses)
+        pages = [call[1]['page']
+                 for call in self.mlist.get_member_page.call_args_list]
+        self.assertEqual(pages, [1, 2, 3])
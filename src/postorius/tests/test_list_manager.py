@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils.six.moves.urllib.error import HTTPError
+from django.utils.six.moves.urllib.parse import parse_qsl
+
+from postorius.models import Domain, List, Mailman404Error
+
+
+@override_settings(POSTORIUS_ROSTER_PAGE_SIZE=2)
+class TestBulkUnsubscribe(TestCase):
+
+    def setUp(self):
+        self.members = {}
+        self.mlist = mock.Mock()
+        self.mlist.fqdn_listname = 'foo@example.com'
+
+    def _set_roster(self, addresses):
+        for address in addresses:
+            self.members[address] = mock.Mock(email=address)
+
+        def get_member_page(count, page):
+            members = list(self.members.values())
+            roster = mock.MagicMock()
+            roster.__iter__.return_value = members[
+                (page - 1) * count:page * count]
+            roster.total_size = len(members)
+            return roster
+        self.mlist.get_member_page.side_effect = get_member_page
+
+    def test_prefilters_with_roster(self):
+        self._set_roster(['a@example.com', 'b@example.com', 'c@example.com'])
+        self.members['c@example.com'].unsubscribe.side_effect = HTTPError(
+            'url', 500, b'Server error', None, None)
+        result = List.objects.bulk_unsubscribe(
+            self.mlist, ['A@example.com', 'c@example.com', 'x@example.com',
+                         'a@example.com'])
+        self.assertEqual(result.unsubscribed, ['a@example.com'])
+        self.assertEqual(result.not_members, ['x@example.com'])
+        self.assertEqual(result.errors, {'c@example.com': 'Server error'})
+        self.assertEqual(self.members['a@example.com'].unsubscribe.call_count,
+                         1)
+        self.assertFalse(self.members['b@example.com'].unsubscribe.called)
+        self.assertFalse(self.mlist.unsubscribe.called)
+
+    def test_large_roster_is_not_fetched(self):
+        # Two pages of roster to check a single address isn't worth it.
+        self._set_roster(['a@example.com', 'b@example.com', 'c@example.com'])
+
+        def unsubscribe(address):
+            if address == 'x@example.com':
+                raise ValueError('x@example.com is not a member address')
+        self.mlist.unsubscribe.side_effect = unsubscribe
+        result = List.objects.bulk_unsubscribe(self.mlist, ['x@example.com'])
+        self.assertEqual(result.unsubscribed, [])
+        self.assertEqual(result.not_members, ['x@example.com'])
+        self.assertEqual(self.mlist.get_member_page.call_count, 1)
+        self.mlist.unsubscribe.assert_called_once_with('x@example.com')
+
+
+@override_settings(POSTORIUS_HELD_PAGE_SIZE=2)
+class TestBulkModeration(TestCase):
+
+    def setUp(self):
+        self.mlist = mock.Mock(list_id='foo.example.com')
+        self.held = [
+            mock.Mock(request_id=1, sender='spam@example.com',
+                      subject='Buy now', reason='Non-member post'),
+            mock.Mock(request_id=2, sender='anne@example.com',
+                      subject='Hello', reason='Non-member post'),
+            mock.Mock(request_id=3, sender='SPAM@example.org',
+                      subject=None, reason='Message too big'),
+        ]
+
+        def get_held_page(count, page):
+            held_page = mock.MagicMock()
+            held_page.__iter__.return_value = self.held[
+                (page - 1) * count:page * count]
+            held_page.total_size = len(self.held)
+            return held_page
+        self.mlist.get_held_page.side_effect = get_held_page
+
+    def test_find_held_messages_across_pages(self):
+        found = List.objects.find_held_messages(self.mlist, sender='spam')
+        self.assertEqual([held.request_id for held in found], [1, 3])
+        found = List.objects.find_held_messages(
+            self.mlist, sender='spam', reason='non-member')
+        self.assertEqual([held.request_id for held in found], [1])
+        self.assertEqual(
+            len(List.objects.find_held_messages(self.mlist)), 3)
+
+    @override_settings(POSTORIUS_CACHE_ALIAS='default')
+    def test_held_message_ids_cached(self):
+        cache.clear()
+        self.assertEqual(
+            List.objects.find_held_message_ids(self.mlist, sender='SPAM'),
+            [1, 3])
+        calls = self.mlist.get_held_page.call_count
+        self.assertEqual(
+            List.objects.find_held_message_ids(self.mlist, sender='spam'),
+            [1, 3])
+        self.assertEqual(self.mlist.get_held_page.call_count, calls)
+        # Moderating a message forgets the searches.
+        List.objects.forget_held_message('foo.example.com', 1)
+        List.objects.find_held_message_ids(self.mlist, sender='spam')
+        self.assertGreater(self.mlist.get_held_page.call_count, calls)
+
+    def test_get_held_messages(self):
+        def get_held_message(held_id):
+            if held_id == 2:
+                raise HTTPError('url', 404, b'404 Not Found', None, None)
+            return self.held[held_id - 1]
+        self.mlist.get_held_message.side_effect = get_held_message
+        self.assertEqual(
+            List.objects.get_held_messages(self.mlist, [3, 2, 1]),
+            [self.held[2], self.held[0]])
+
+    def test_bulk_moderate(self):
+        def discard(held_id):
+            if held_id == '2':
+                raise HTTPError('url', 404, b'404 Not Found', None, None)
+            if held_id == '3':
+                raise HTTPError('url', 500, b'Server error', None, None)
+        self.mlist.discard_message.side_effect = discard
+        result = List.objects.bulk_moderate(
+            self.mlist, ['1', '2', '3', '1'], 'discard')
+        self.assertEqual(result.moderated, ['1'])
+        self.assertEqual(result.errors, {
+            '2': 'Message could not be found', '3': 'Server error'})
+        self.assertEqual(self.mlist.discard_message.call_count, 3)
+
+    def test_bulk_moderate_unknown_action(self):
+        with self.assertRaises(ValueError):
+            List.objects.bulk_moderate(self.mlist, ['1'], 'defer')
+
+
+@override_settings(POSTORIUS_CACHE_ALIAS='default')
+class TestHeldMessageSummaries(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.held = mock.Mock(
+            request_id=1, sender='anne@example.com', subject='Hello',
+            reason='Non-member post', hold_date='2019-01-01T00:00:00',
+            msg='From: anne@example.com\nSubject: Hello\n\n'
+                'Hi there,\n\n' + 'long text ' * 100)
+
+    def test_summaries(self):
+        summary, = List.objects.summarize_held_messages(
+            'foo.example.com', [self.held])
+        self.assertEqual(summary.request_id, 1)
+        self.assertEqual(summary.subject, 'Hello')
+        self.assertFalse(hasattr(summary, 'msg'))
+        self.assertTrue(summary.preview.startswith('Hi there, long text'))
+        self.assertTrue(summary.preview.endswith('\u2026'))
+        self.assertLessEqual(len(summary.preview), 201)
+
+    def test_previews_cached(self):
+        List.objects.summarize_held_messages('foo.example.com', [self.held])
+        self.held.msg = 'Subject: Changed\n\nOther text'
+        summary, = List.objects.summarize_held_messages(
+            'foo.example.com', [self.held])
+        self.assertTrue(summary.preview.startswith('Hi there'))
+        List.objects.forget_held_message('foo.example.com', 1)
+        summary, = List.objects.summarize_held_messages(
+            'foo.example.com', [self.held])
+        self.assertEqual(summary.preview, 'Other text')
+
+
+@override_settings(POSTORIUS_CACHE_ALIAS='default')
+class TestSubscriptionRequests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.mlist = mock.Mock(list_id='foo.example.com')
+        patcher = mock.patch('postorius.models.get_mailman_client')
+        self.call = patcher.start().return_value._connection.call
+        self.addCleanup(patcher.stop)
+        self.call.return_value = (mock.Mock(status=200), {
+            'total_size': 3,
+            'entries': [
+                {'token': 'a', 'email': 'a@example.com',
+                 'token_owner': 'moderator'},
+                {'token': 'b', 'email': 'b@example.com',
+                 'token_owner': 'subscriber'},
+            ]})
+
+    def test_request_page(self):
+        page = List.objects.get_request_page(self.mlist, count=2, page=1)
+        self.assertEqual(page.total_size, 3)
+        self.assertEqual([entry['token'] for entry in page], ['a'])
+        self.call.assert_called_once_with(
+            'lists/foo.example.com/requests'
+            '?token_owner=moderator&count=2&page=1')
+
+    def test_bulk_moderate_requests(self):
+        def moderate_request(token, action):
+            if token == 'b':
+                raise HTTPError('url', 409, 'Conflict', None, None)
+            if token == 'c':
+                raise HTTPError('url', 404, b'Not found', None, None)
+        self.mlist.moderate_request.side_effect = moderate_request
+        result = List.objects.bulk_moderate_requests(
+            self.mlist, ['a', 'b', 'c'], 'accept')
+        self.assertEqual(result.moderated, ['a', 'b'])
+        self.assertEqual(result.errors, {'c': 'Not found'})
+        self.mlist.moderate_request.assert_any_call('a', 'accept')
+
+
+@override_settings(POSTORIUS_CACHE_ALIAS='default',
+                   POSTORIUS_FIND_PAGE_SIZE=2)
+class TestFindBySubscriber(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('postorius.models.get_mailman_client')
+        self.find_lists = patcher.start().return_value.find_lists
+        self.addCleanup(patcher.stop)
+        lists = [mock.Mock(list_id='list{}.example.com'.format(i))
+                 for i in range(5)]
+        self.find_lists.side_effect = (
+            lambda address, role=None, count=50, page=1:
+            lists[(page - 1) * count:page * count])
+
+    def test_all_pages(self):
+        # Lists past the first page of results are found too.
+        found = List.objects.find_by_subscriber(['owner@example.com'], 'owner')
+        self.assertEqual(
+            [mlist.list_id for mlist in found],
+            ['list{}.example.com'.format(i) for i in range(5)])
+        self.assertEqual(self.find_lists.call_count, 3)
+        self.find_lists.assert_called_with(
+            'owner@example.com', role='owner', count=2, page=3)
+
+
+@override_settings(POSTORIUS_CACHE_ALIAS='default',
+                   POSTORIUS_REQUEST_PAGE_SIZE=2)
+class TestUserSubscriptionStatus(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.mlist = mock.Mock(list_id='foo.example.com')
+        self.requests = [
+            {'email': 'other@example.com', 'token': 'a',
+             'token_owner': 'subscriber'},
+            {'email': 'another@example.com', 'token': 'b',
+             'token_owner': 'moderator'},
+            {'email': 'Pending@example.com', 'token': 'c',
+             'token_owner': 'moderator'},
+        ]
+        patcher = mock.patch('postorius.models.get_mailman_client')
+        self.call = patcher.start().return_value._connection.call
+        self.addCleanup(patcher.stop)
+
+        def call(path, data=None):
+            if path == 'members/find':
+                if data['subscriber'] == 'member@example.com':
+                    return mock.Mock(status=200), {
+                        'total_size': 1, 'entries': [{'role': 'member'}]}
+                return mock.Mock(status=200), {'total_size': 0}
+            query = dict(parse_qsl(path.split('?', 1)[1]))
+            start = (int(query['page']) - 1) * int(query['count'])
+            return mock.Mock(status=200), {
+                'total_size': len(self.requests),
+                'entries': self.requests[start:start + int(query['count'])]}
+        self.call.side_effect = call
+
+    def test_subscribed_address(self):
+        self.assertEqual(
+            List.objects.get_subscribed_address(
+                self.mlist, ['other@example.com', 'member@example.com']),
+            'member@example.com')
+        self.assertIsNone(List.objects.get_subscribed_address(
+            self.mlist, ['other@example.com']))
+        # Only the membership in the list is searched.
+        self.call.assert_any_call('members/find', dict(
+            list_id='foo.example.com', subscriber='member@example.com',
+            role='member'))
+
+    def test_pending_address_all_pages(self):
+        self.assertEqual(
+            List.objects.get_pending_address(
+                self.mlist, ['member@example.com', 'pending@example.com']),
+            'pending@example.com')
+        self.assertEqual(self.call.call_count, 2)
+        self.call.assert_called_with(
+            'lists/foo.example.com/requests?count=2&page=2')
+
+    def test_pending_addresses_fetched_once(self):
+        # The pending requests are fetched once for all the visitors.
+        self.assertEqual(
+            List.objects.get_pending_address(
+                self.mlist, ['other@example.com']), 'other@example.com')
+        self.assertIsNone(List.objects.get_pending_address(
+            self.mlist, ['member@example.com']))
+        self.assertEqual(self.call.call_count, 2)
+
+    def test_pending_address_cached(self):
+        self.assertEqual(
+            List.objects.get_pending_address(
+                self.mlist, ['pending@example.com']), 'pending@example.com')
+        self.requests = []
+        self.assertEqual(
+            List.objects.get_pending_address(
+                self.mlist, ['pending@example.com']), 'pending@example.com')
+        List.objects.forget_requests('foo.example.com')
+        self.assertIsNone(List.objects.get_pending_address(
+            self.mlist, ['pending@example.com']))
+
+
+@override_settings(POSTORIUS_CACHE_ALIAS='default')
+class TestListsByMailHost(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.domain = mock.Mock()
+        self.pages = {
+            1: mock.Mock(total_size=3, has_next=True),
+            2: mock.Mock(total_size=3, has_next=False),
+        }
+        self.pages[1].__iter__ = lambda page: iter(['bar', 'baz'])
+        self.pages[2].__iter__ = lambda page: iter(['foo'])
+        self.domain.get_list_page.side_effect = (
+            lambda count, page, advertised: self.pages[page])
+        patcher = mock.patch.object(Domain.objects, 'get',
+                                    return_value=self.domain)
+        self.get_domain = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_paginated_through_domain(self):
+        self.assertEqual(
+            List.objects.by_mail_host('example.com'), ['bar', 'baz', 'foo'])
+        self.get_domain.assert_called_with(mail_host='example.com')
+        self.domain.get_list_page.assert_called_with(
+            count=100, page=2, advertised=None)
+
+    def test_count_cached(self):
+        self.assertEqual(List.objects.count_by_mail_host('example.com'), 3)
+        self.assertEqual(List.objects.count_by_mail_host('example.com'), 3)
+        self.assertEqual(self.domain.get_list_page.call_count, 1)
+        List.objects.forget_counts('example.com')
+        List.objects.count_by_mail_host('example.com')
+        self.assertEqual(self.domain.get_list_page.call_count, 2)
+
+    def test_unknown_domain(self):
+        self.get_domain.side_effect = Mailman404Error
+        self.assertEqual(List.objects.by_mail_host('example.net'), [])
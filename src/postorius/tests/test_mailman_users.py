@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+from io import StringIO
+
+import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.six.moves.urllib.error import HTTPError
+
+from postorius.models import Mailman404Error, MailmanUser, MailmanUserLink
+
+
+@override_settings(POSTORIUS_REST_CONCURRENCY=1)
+class TestMailmanUserLink(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            'anne', 'anne@example.com', 'testpass')
+        self.mm_user = mock.Mock(user_id='1234', self_link='users/1234')
+        self.users = {'anne@example.com': self.mm_user, '1234': self.mm_user}
+        patcher = mock.patch.object(MailmanUser.objects, 'get',
+                                    side_effect=self._get)
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(MailmanUser.objects, 'create_from_django',
+                                    return_value=self.mm_user)
+        self.create = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get(self, address):
+        try:
+            user = self.users[address]
+        except KeyError:
+            raise Mailman404Error
+        if isinstance(user, Exception):
+            raise user
+        return user
+
+    def test_linked_on_first_lookup(self):
+        self.assertIs(
+            MailmanUser.objects.get_or_create_from_django(self.user),
+            self.mm_user)
+        self.get.assert_called_once_with(address='anne@example.com')
+        link = MailmanUserLink.objects.get(user=self.user)
+        self.assertEqual(link.mailman_id, '1234')
+        self.assertEqual(link.self_link, 'users/1234')
+        # The next lookups use the id.
+        self.get.reset_mock()
+        MailmanUser.objects.get_or_create_from_django(self.user)
+        self.get.assert_called_once_with(address='1234')
+        self.assertFalse(self.create.called)
+
+    def test_revalidated_on_404(self):
+        MailmanUserLink.objects.create(user=self.user, mailman_id='5678')
+        MailmanUser.objects.get_or_create_from_django(self.user)
+        self.assertEqual(
+            [call[1]['address'] for call in self.get.call_args_list],
+            ['5678', 'anne@example.com'])
+        self.assertEqual(
+            MailmanUserLink.objects.get(user=self.user).mailman_id, '1234')
+
+    def test_created_and_linked(self):
+        del self.users['anne@example.com']
+        MailmanUser.objects.get_or_create_from_django(self.user)
+        self.create.assert_called_once_with(self.user)
+        self.assertTrue(
+            MailmanUserLink.objects.filter(user=self.user).exists())
+
+    def test_link_command(self):
+        User.objects.create_user('bart', 'bart@example.com', 'testpass')
+        output = StringIO()
+        call_command('link_mailman_users', stdout=output)
+        self.assertEqual(MailmanUserLink.objects.get().user, self.user)
+        self.assertIn('Linked 1 users, 1 have no Mailman user.',
+                      output.getvalue())
+        self.assertFalse(self.create.called)
+        call_command('link_mailman_users', '--create', stdout=output)
+        self.assertEqual(MailmanUserLink.objects.count(), 2)
+
+    def test_link_command_errors(self):
+        bart = User.objects.create_user('bart', 'bart@example.com', 'pass')
+        self.users['bart@example.com'] = HTTPError(
+            'url', 500, 'Internal error', {}, None)
+        # Anne was linked by a request meanwhile.
+        MailmanUserLink.objects.create(user=self.user, mailman_id='5678')
+        with mock.patch('postorius.management.commands.link_mailman_users'
+                        '.User.objects.filter',
+                        return_value=User.objects.order_by('pk')):
+            output, errors = StringIO(), StringIO()
+            call_command('link_mailman_users', stdout=output, stderr=errors)
+        self.assertIn('Linked 1 users', output.getvalue())
+        self.assertIn('Could not link bart: Internal error',
+                      errors.getvalue())
+        self.assertIn('1 users could not be linked', errors.getvalue())
+        self.assertEqual(
+            MailmanUserLink.objects.get(user=self.user).mailman_id, '1234')
+        self.assertFalse(MailmanUserLink.objects.filter(user=bart).exists())
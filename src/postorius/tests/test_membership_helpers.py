@@ -23,7 +23,7 @@ from allauth.account.models import EmailAddress
 from django.contrib.auth.models import User
 from mailmanclient import MailingList
 
-from postorius.models import Mailman404Error
+from postorius.models import Mailman404Error, Member
 from postorius.tests.utils import ViewTestCase
 from postorius.templatetags.membership_helpers import (
     get_list, user_is_list_owner, user_is_list_moderator)
@@ -86,6 +86,8 @@ class TestMembershipHelpers(ViewTestCase):
         self.assertFalse(user_is_list_owner(self.test_moderator, self.mlist))
         # Now let's add the test_user as an owner of the list.
         self.mlist.add_owner(self.test_user.email)
+        # The roles changed behind Postorius' back.
+        Member.objects.invalidate_cache(self.test_user.email)
         self.assertTrue(user_is_list_owner(self.test_user, self.mlist))
 
     def test_user_is_list_moderator(self):
@@ -98,4 +100,6 @@ class TestMembershipHelpers(ViewTestCase):
                                                self.mlist))
         # Now let's add the test_user as an owner of the list.
         self.mlist.add_moderator(self.test_user.email)
+        # The roles changed behind Postorius' back.
+        Member.objects.invalidate_cache(self.test_user.email)
         self.assertTrue(user_is_list_moderator(self.test_user, self.mlist))
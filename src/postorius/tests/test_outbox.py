@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.six.moves.urllib.error import HTTPError
+
+from postorius import outbox
+from postorius.models import (
+    CoreUpdate, EmailTemplate, Mailman404Error, MailmanUser, MailmanUserLink)
+
+
+@override_settings(POSTORIUS_REST_CONCURRENCY=1)
+class TestOutbox(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(EmailTemplate, '_update_core')
+        self.update_core = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_template(self):
+        return EmailTemplate.objects.create(
+            name='list:admin:action:post', data='Some data.',
+            context='list', identifier='foo.example.com')
+
+    def test_delivered_inline(self):
+        self._create_template()
+        self.update_core.assert_called_once_with(deleted=False)
+        self.assertFalse(CoreUpdate.objects.exists())
+
+    @override_settings(POSTORIUS_OUTBOX_RUNNER='command')
+    def test_updates_collapsed(self):
+        template = self._create_template()
+        template.data = 'Other data.'
+        template.save()
+        template.delete()
+        self.assertFalse(self.update_core.called)
+        self.assertEqual(CoreUpdate.objects.count(), 1)
+        self.assertEqual(outbox.get_backlog()['pending'], 1)
+        outbox.dispatch_all()
+        self.update_core.assert_called_once_with(deleted=True)
+        self.assertFalse(CoreUpdate.objects.exists())
+
+    def test_failed_delivery_retried(self):
+        self.update_core.side_effect = HTTPError(
+            'url', 500, 'Internal error', {}, None)
+        self._create_template()
+        update = CoreUpdate.objects.get()
+        self.assertEqual(update.attempts, 1)
+        self.assertGreater(update.next_attempt_at, timezone.now())
+        self.assertEqual(outbox.get_backlog()['failing'], 1)
+        # Not due yet.
+        self.assertEqual(outbox.dispatch(), 0)
+        CoreUpdate.objects.update(next_attempt_at=timezone.now())
+        self.update_core.side_effect = None
+        self.assertEqual(outbox.dispatch(), 1)
+        self.assertFalse(CoreUpdate.objects.exists())
+
+    def test_next_delay(self):
+        self.assertIsNone(outbox.get_next_delay())
+        self.update_core.side_effect = HTTPError(
+            'url', 500, 'Internal error', {}, None)
+        self._create_template()
+        self.assertAlmostEqual(
+            outbox.get_next_delay(), outbox.RETRY_DELAY, delta=5)
+        CoreUpdate.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.get_next_delay(), 0)
+
+    def test_thread_waits_for_retries(self):
+        # The thread waits for the failed update to be due instead of
+        # stopping.
+        self.update_core.side_effect = [
+            HTTPError('url', 500, 'Internal error', {}, None), None]
+        self._create_template()
+        delays = []
+
+        def wait(delay):
+            delays.append(delay)
+            CoreUpdate.objects.update(next_attempt_at=timezone.now())
+
+        with mock.patch.object(outbox, '_wakeup') as wakeup, \
+                mock.patch.object(outbox, 'connection'):
+            wakeup.is_set.return_value = False
+            wakeup.wait.side_effect = wait
+            outbox._run_thread()
+        self.assertEqual(len(delays), 1)
+        self.assertAlmostEqual(delays[0], outbox.RETRY_DELAY, delta=5)
+        self.assertEqual(self.update_core.call_count, 2)
+        self.assertFalse(CoreUpdate.objects.exists())
+        self.assertIsNone(outbox._thread)
+
+    def test_retry_delay(self):
+        self.assertEqual(outbox.get_retry_delay(1), outbox.RETRY_DELAY)
+        self.assertEqual(outbox.get_retry_delay(2), outbox.RETRY_DELAY * 2)
+        self.assertEqual(outbox.get_retry_delay(100), outbox.MAX_RETRY_DELAY)
+
+    @override_settings(AUTOCREATE_MAILMAN_USER=True)
+    def test_mailman_user_created(self):
+        mm_user = mock.Mock(user_id='1234', self_link='users/1234')
+        with mock.patch.object(MailmanUser.objects, 'get',
+                               side_effect=Mailman404Error), \
+                mock.patch.object(MailmanUser.objects, 'create',
+                                  return_value=mm_user) as create:
+            user = User.objects.create_user(
+                'anne', 'anne@example.com', 'testpass')
+        create.assert_called_once_with(
+            email='anne@example.com', password=None, display_name='')
+        self.assertEqual(
+            MailmanUserLink.objects.get(user=user).mailman_id, '1234')
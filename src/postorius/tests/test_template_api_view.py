@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from postorius.models import EmailTemplate
+
+
+@override_settings(POSTORIUS_CACHE_ALIAS='default')
+class TestTemplateData(TransactionTestCase):
+    # The served templates are forgotten once the changes are committed.
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(EmailTemplate, '_update_core')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.template = EmailTemplate.objects.create(
+            name='list:admin:action:post', data='Some data.',
+            context='list', identifier='foo.example.com')
+        self.url = reverse('rest_template', kwargs=dict(
+            context='list', identifier='foo.example.com',
+            name='list:admin:action:post'))
+
+    def test_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'Some data.')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('max-age=', response['Cache-Control'])
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_served_from_cache(self):
+        self.client.get(self.url)
+        # Only the modification time is checked.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.content, b'Some data.')
+
+    def test_changes_from_other_process(self):
+        # Changes which did not go through this process' signals are seen.
+        self.client.get(self.url)
+        EmailTemplate.objects.filter(pk=self.template.pk).update(
+            data='Other data.',
+            modified_at=self.template.modified_at + timedelta(seconds=1))
+        response = self.client.get(self.url)
+        self.assertEqual(response.content, b'Other data.')
+
+    def test_changes_invalidate(self):
+        etag = self.client.get(self.url)['ETag']
+        self.template.data = 'Other data.'
+        self.template.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'Other data.')
+        self.template.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_import_invalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'templates.json')
+        with open(path, 'w') as f:
+            json.dump([{'context': 'list', 'identifier': 'foo.example.com',
+                        'name': 'list:admin:action:post',
+                        'data': 'Imported data.'}], f)
+        call_command('import_templates', path, stdout=StringIO(),
+                     stderr=StringIO())
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'Imported data.')
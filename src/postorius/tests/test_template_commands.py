@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 by the Free Software Foundation, Inc.
+#
+# This file is part of Postorius.
+#
+# Postorius is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option)
+# any later version.
+#
+# Postorius is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Postorius.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+import mock
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from postorius.models import CoreUpdate, EmailTemplate, List
+
+
+@override_settings(POSTORIUS_REST_CONCURRENCY=1)
+class TestTemplateCommands(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(EmailTemplate, '_update_core')
+        self.update_core = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        EmailTemplate.objects.create(
+            name='list:member:regular:footer', data='Footer',
+            context='list', identifier='foo.example.com')
+        EmailTemplate.objects.create(
+            name='list:admin:action:post', data='Post', language='fr',
+            context='domain', identifier='example.com')
+        self.update_core.reset_mock()
+
+    def _call(self, *args):
+        call_command(*args, stdout=StringIO(), stderr=StringIO())
+
+    def test_export_import_tar(self):
+        path = os.path.join(self.tmpdir, 'templates.tar.gz')
+        self._call('export_templates', path)
+        EmailTemplate.objects.all().delete()
+        self.update_core.reset_mock()
+        self._call('import_templates', path)
+        self.assertEqual(
+            set(EmailTemplate.objects.values_list(
+                'context', 'identifier', 'name', 'language', 'data')),
+            {('list', 'foo.example.com', 'list:member:regular:footer', '',
+              'Footer'),
+             ('domain', 'example.com', 'list:admin:action:post', 'fr',
+              'Post')})
+        self.assertEqual(self.update_core.call_count, 2)
+        self.assertFalse(CoreUpdate.objects.exists())
+
+    def test_import_all_lists(self):
+        path = os.path.join(self.tmpdir, 'templates.json')
+        with open(path, 'w') as f:
+            json.dump([{'context': 'list', 'identifier': '*',
+                        'name': 'list:member:regular:footer',
+                        'data': 'New footer'}], f)
+        lists = [mock.Mock(list_id='{}.example.com'.format(name))
+                 for name in ('foo', 'bar', 'baz')]
+        with mock.patch.object(List.objects, 'all', return_value=lists):
+            self._call('import_templates', path)
+        self.assertEqual(
+            set(EmailTemplate.objects.filter(
+                name='list:member:regular:footer').values_list(
+                    'identifier', 'data')),
+            {('foo.example.com', 'New footer'),
+             ('bar.example.com', 'New footer'),
+             ('baz.example.com', 'New footer')})
+        self.assertEqual(self.update_core.call_count, 3)
+        # Unchanged templates aren't set again.
+        self.update_core.reset_mock()
+        with mock.patch.object(List.objects, 'all', return_value=lists):
+            self._call('import_templates', path)
+        self.assertFalse(self.update_core.called)
@@ -19,9 +19,12 @@
 
 from __future__ import absolute_import, unicode_literals
 
-from django.test import RequestFactory, TestCase
+import mock
+from django.test import RequestFactory, TestCase, override_settings
 
-from postorius.utils import render_api_error
+from postorius.utils import (
+    HttpPool, MailmanClientRegistry, MailmanConnection, begin_request_cache,
+    concurrent_map, end_request_cache, get_request_cache, render_api_error)
 
 
 class TestUtils(TestCase):
@@ -35,3 +38,132 @@ class TestUtils(TestCase):
         self.assertTrue('Mailman REST API not available.' in
                         str(response.content))
         self.assertEquals(response.status_code, 503)
+
+
+class TestHttpPool(TestCase):
+
+    def test_reuses_released_http(self):
+        pool = HttpPool(2)
+        http = pool.acquire()
+        pool.release(http)
+        self.assertIs(pool.acquire(), http)
+
+    def test_pool_is_bounded(self):
+        pool = HttpPool(1)
+        first, second = pool.acquire(), pool.acquire()
+        second.connections['http:localhost'] = mock.Mock()
+        pool.release(first)
+        pool.release(second)
+        # The second one didn't fit in the pool and was closed.
+        self.assertEqual(second.connections, {})
+        self.assertIs(pool.acquire(), first)
+        self.assertIsNot(pool.acquire(), second)
+
+    def test_size_zero_disables_pooling(self):
+        pool = HttpPool(0)
+        http = pool.acquire()
+        pool.release(http)
+        self.assertIsNot(pool.acquire(), http)
+
+
+@override_settings(POSTORIUS_REST_POOL_SIZE=3)
+class TestMailmanClientRegistry(TestCase):
+
+    def setUp(self):
+        self.registry = MailmanClientRegistry()
+
+    def test_client_is_shared(self):
+        client = self.registry.get()
+        self.assertIs(self.registry.get(), client)
+        self.assertIsInstance(client._connection, MailmanConnection)
+        self.assertEqual(client._connection.pool.size, 3)
+
+    def test_client_per_credentials(self):
+        client = self.registry.get()
+        with self.settings(MAILMAN_REST_API_USER='otheradmin'):
+            self.assertIsNot(self.registry.get(), client)
+        self.assertIs(self.registry.get(), client)
+
+    def test_client_per_api_version(self):
+        client = self.registry.get()
+        self.assertTrue(client._connection.baseurl.endswith('/3.1/'))
+        views_client = self.registry.get('3.0')
+        self.assertIsNot(views_client, client)
+        self.assertTrue(views_client._connection.baseurl.endswith('/3.0/'))
+        self.assertIs(self.registry.get('3.0'), views_client)
+
+    def test_client_recreated_after_fork(self):
+        client = self.registry.get()
+        with mock.patch('postorius.utils.os.getpid', return_value=-1):
+            forked_client = self.registry.get()
+            self.assertIsNot(forked_client, client)
+            self.assertIs(self.registry.get(), forked_client)
+
+    def test_clear(self):
+        client = self.registry.get()
+        self.registry.clear()
+        self.assertIsNot(self.registry.get(), client)
+
+
+class TestRequestCache(TestCase):
+
+    def setUp(self):
+        self.connection = MailmanConnection(
+            'http://localhost:9001/3.1', 'restadmin', 'restpass')
+        # Only the request cache is tested here.
+        self.connection.shared_cache = None
+        patcher = mock.patch('httplib2.Http.request')
+        self.http_request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.http_request.return_value = (
+            mock.Mock(status=200), b'{"foo": "bar"}')
+        begin_request_cache()
+        self.addCleanup(end_request_cache)
+
+    def test_get_is_memoized(self):
+        response, content = self.connection.call('lists/foo.example.com')
+        content['foo'] = 'changed'
+        response, content = self.connection.call('lists/foo.example.com')
+        # The second read was served from the cache, unchanged.
+        self.assertEqual(content, {'foo': 'bar'})
+        self.assertEqual(self.http_request.call_count, 1)
+        cache = get_request_cache()
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_write_clears_cache(self):
+        self.connection.call('lists/foo.example.com/config')
+        self.connection.call(
+            'lists/foo.example.com/config', {'description': 'x'}, 'PATCH')
+        self.connection.call('lists/foo.example.com/config')
+        self.assertEqual(self.http_request.call_count, 3)
+
+    def test_no_cache_outside_request(self):
+        end_request_cache()
+        self.connection.call('lists/foo.example.com')
+        self.connection.call('lists/foo.example.com')
+        self.assertEqual(self.http_request.call_count, 2)
+        self.assertIsNone(get_request_cache())
+
+
+class TestConcurrentMap(TestCase):
+
+    def test_results_in_order(self):
+        self.assertEqual(concurrent_map(lambda x: x * 2, range(20), 4),
+                         [x * 2 for x in range(20)])
+
+    def test_exceptions(self):
+        def func(x):
+            if x == 3:
+                raise ValueError(x)
+            return x
+        with self.assertRaises(ValueError):
+            concurrent_map(func, range(5), 2)
+        results = concurrent_map(func, range(5), 2, return_exceptions=True)
+        self.assertEqual(results[:3], [0, 1, 2])
+        self.assertIsInstance(results[3], ValueError)
+        self.assertEqual(results[4], 4)
+
+    @override_settings(POSTORIUS_REST_CONCURRENCY=1)
+    def test_serial(self):
+        self.assertEqual(concurrent_map(str, [1, 2]), ['1', '2'])
@@ -31,6 +31,8 @@ from six.moves.urllib_parse import (
 from django_mailman3.lib.mailman import get_mailman_client
 from django_mailman3.tests.utils import get_flash_messages
 
+from postorius.models import mailman_cache
+
 
 vcr_log = logging.getLogger('vcr')
 vcr_log.setLevel(logging.WARNING)
@@ -164,6 +166,7 @@ class ViewTestCase(TransactionTestCase):
     _mm_vcr = get_vcr(cassette_library_dir=_fixtures_dir)
 
     def setUp(self):
+        mailman_cache.cache.clear()
         self.mm_client = get_mailman_client()
         if self.use_vcr:
             cm = self._mm_vcr.use_cassette('.'.join([
@@ -52,6 +52,8 @@ list_patterns = [
         name='handle_subscription_request'),
     url(r'^mass_subscribe/$', list_views.list_mass_subscribe,
         name='mass_subscribe'),
+    url(r'^jobs/(?P<job_id>\d+)/$', list_views.membership_job,
+        name='membership_job'),
     url(r'^mass_removal/$', list_views.ListMassRemovalView.as_view(),
         name='mass_removal'),
     url(r'^delete$', list_views.list_delete, name='list_delete'),
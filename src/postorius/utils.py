@@ -17,16 +17,37 @@
 # Postorius.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import copy
+import json
 import logging
+import os
+import re
+import threading
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Full, LifoQueue
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urljoin, urlparse
 
 from django.conf import settings
 from django.shortcuts import render
 from django.utils.translation import gettext as _
-from mailmanclient import Client
+from httplib2 import Http, Response
+from mailmanclient import Client, MailmanConnectionError
+from mailmanclient.restbase.connection import Connection
 
 
 logger = logging.getLogger(__name__)
 
+# Number of idle HTTP connections to Mailman Core kept around per process.
+DEFAULT_REST_POOL_SIZE = 10
+# Versions of Core's REST API: the models use 3.1, while the views use 3.0
+# like django_mailman3's client, which they were written against.
+MODELS_API_VERSION = '3.1'
+VIEWS_API_VERSION = '3.0'
+# Number of REST calls a single request may run at the same time.
+DEFAULT_REST_CONCURRENCY = 8
+
 
 def render_api_error(request):
     """Renders an error template.
@@ -37,14 +58,334 @@ def render_api_error(request):
                   status=503)
 
 
-def get_mailman_client():
+class HttpPool(object):
+    """A bounded, thread-safe pool of ``httplib2.Http`` objects.
+
+    Every ``Http`` object keeps its connections open, so handing the same
+    object to consecutive requests lets them use HTTP keep-alive instead of
+    setting up a new TCP (and TLS) connection each time. A size of 0 disables
+    pooling altogether.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._idle = LifoQueue(maxsize=max(size, 1))
+
+    def acquire(self):
+        """Return an idle ``Http`` object or a new one if none is left."""
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            return Http()
+
+    def release(self, http):
+        """Give back an ``Http`` object once the request is done."""
+        if self.size <= 0:
+            self._close(http)
+            return
+        try:
+            self._idle.put_nowait(http)
+        except Full:
+            self._close(http)
+
+    def discard(self, http):
+        """Drop an ``Http`` object whose connection can't be trusted."""
+        self._close(http)
+
+    def clear(self):
+        """Close all the idle connections."""
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except Empty:
+                break
+
+    @staticmethod
+    def _close(http):
+        for connection in http.connections.values():
+            connection.close()
+        http.connections.clear()
+
+
+class RequestCache(object):
+    """Identity map of Core's REST responses for a single web request.
+
+    GET responses are kept by URL, so that a resource read more than once
+    while handling a request costs only one round trip. Any other method
+    empties the cache, since it might have changed what was read before.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._responses = {}
+        # The cache is shared with the threads of concurrent_map().
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            try:
+                response, content = self._responses[url]
+            except KeyError:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # Callers are free to modify what they get back.
+        return response, copy.deepcopy(content)
+
+    def set(self, url, response, content):
+        content = copy.deepcopy(content)
+        with self._lock:
+            self._responses[url] = (response, content)
+
+    def clear(self):
+        with self._lock:
+            self._responses.clear()
+
+
+_local = threading.local()
+
+
+def get_request_cache():
+    """Return the current thread's :class:`RequestCache`, if any."""
+    return getattr(_local, 'request_cache', None)
+
+
+def begin_request_cache():
+    """Start caching REST responses for the current thread."""
+    _local.request_cache = RequestCache()
+    return _local.request_cache
+
+
+def end_request_cache():
+    """Stop caching REST responses for the current thread."""
+    cache = get_request_cache()
+    _local.request_cache = None
+    return cache
+
+
+class MailmanConnection(Connection):
+    """Connection to Mailman Core's REST API which reuses HTTP connections.
+
+    mailmanclient creates a new ``Http`` object, and thus a new connection to
+    Core, for every single call. This connection borrows them from a
+    :class:`HttpPool` instead. GET responses are also served from the
+    thread's :class:`RequestCache` while one is active, and from the
+    ``shared_cache`` for the resources it knows about. The same goes for
+    searches, which are read-only POST requests.
+    """
+
+    # Set to the postorius.models.MailmanCache instance.
+    shared_cache = None
+
+    # Searches which Core takes as POST requests, but which change nothing.
+    read_only_posts = ('lists/find', 'members/find')
+
+    # Resources kept out of the request cache, which copies its entries:
+    # held messages carry the whole raw messages.
+    request_cache_exclude = re.compile(r'^lists/[^/]+/held')
+
+    def __init__(self, baseurl, name=None, password=None, pool=None):
+        super(MailmanConnection, self).__init__(baseurl, name, password)
+        if not baseurl.endswith('/'):
+            baseurl += '/'
+        self.baseurl = baseurl
+        self.api_version = baseurl.rstrip('/').rsplit('/', 1)[-1]
+        self.pool = pool if pool is not None else HttpPool(0)
+        if name is None:
+            self._authorization = None
+        else:
+            auth = '{0}:{1}'.format(name, password)
+            self._authorization = 'Basic ' + b64encode(
+                auth.encode('utf-8')).decode('utf-8')
+
+    def call(self, path, data=None, method=None):
+        headers = {'User-Agent': 'Postorius'}
+        data_str = None
+        if data is not None:
+            data_str = urlencode(data, doseq=True)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if method is None:
+            method = 'GET' if data_str is None else 'POST'
+        method = method.upper()
+        if self._authorization:
+            headers['Authorization'] = self._authorization
+        if urlparse(path).scheme == '':
+            url = urljoin(self.baseurl, path)
+        else:
+            url = path
+        path = None
+        if url.startswith(self.baseurl):
+            path = url[len(self.baseurl):]
+        if method == 'GET' or (
+                method == 'POST' and path in self.read_only_posts):
+            return self._read(url, path, method, data, data_str, headers)
+        request_cache = get_request_cache()
+        if request_cache is not None:
+            request_cache.clear()
+        return self._request(url, method, data_str, headers)
+
+    def _read(self, url, path, method, data, data_str, headers):
+        key = url if data_str is None else '{} {}'.format(url, data_str)
+        request_cache = get_request_cache()
+        if path is not None and self.request_cache_exclude.match(path):
+            request_cache = None
+        if request_cache is not None:
+            cached = request_cache.get(key)
+            if cached is not None:
+                return cached
+        content = None
+        if path is not None and self.shared_cache is not None:
+            content = self.shared_cache.get_resource(
+                path, data, self.api_version)
+        if content is not None:
+            response = Response({'status': 200})
+        else:
+            try:
+                response, content = self._request(
+                    url, method, data_str, headers)
+            except HTTPError as e:
+                if e.code != 404 or method != 'POST':
+                    raise
+                # Core answers searches without results with a 404: keep
+                # them as an empty collection, so that they are cached too.
+                response = Response({'status': 200})
+                content = {'start': 0, 'total_size': 0}
+            if path is not None and self.shared_cache is not None:
+                self.shared_cache.set_resource(
+                    path, content, data, self.api_version)
+        if request_cache is not None:
+            request_cache.set(key, response, content)
+        return response, content
+
+    def _request(self, url, method, data_str, headers):
+        http = self.pool.acquire()
+        try:
+            response, content = http.request(url, method, data_str, headers)
+        except IOError:
+            self.pool.discard(http)
+            raise MailmanConnectionError('Could not connect to Mailman API')
+        self.pool.release(http)
+        # If we did not get a 2xx status code, make this look like a urllib2
+        # exception, like mailmanclient does.
+        if response.status // 100 != 2:
+            raise HTTPError(url, response.status, content, response, None)
+        if len(content) == 0:
+            return response, None
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        return response, json.loads(content)
+
+
+class MailmanClientRegistry(object):
+    """Process-wide registry of Mailman REST API clients.
+
+    Clients are shared by all the threads of a process and keyed by the REST
+    API credentials and version. They are re-created in a forked child, so
+    that worker processes never share sockets with their parent.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._pid = os.getpid()
+
+    def get(self, api_version=MODELS_API_VERSION):
+        key = (settings.MAILMAN_REST_API_URL,
+               settings.MAILMAN_REST_API_USER,
+               settings.MAILMAN_REST_API_PASS,
+               api_version)
+        pid = os.getpid()
+        client = self._clients.get(key) if self._pid == pid else None
+        if client is None:
+            with self._lock:
+                if self._pid != pid:
+                    # We were forked. Forget about the parent's connections
+                    # without closing them, they still belong to the parent.
+                    self._clients = {}
+                    self._pid = pid
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._create_client(*key)
+                    self._clients[key] = client
+        return client
+
+    def clear(self):
+        """Drop all the clients and close their idle connections."""
+        with self._lock:
+            for client in self._clients.values():
+                client._connection.pool.clear()
+            self._clients = {}
+
+    def _create_client(self, url, user, password, api_version):
+        baseurl = '%s/%s' % (url, api_version)
+        client = Client(baseurl, user, password)
+        pool_size = getattr(
+            settings, 'POSTORIUS_REST_POOL_SIZE', DEFAULT_REST_POOL_SIZE)
+        client._connection = MailmanConnection(
+            baseurl, user, password, pool=HttpPool(pool_size))
+        return client
+
+
+client_registry = MailmanClientRegistry()
+
+
+def get_mailman_client(api_version=MODELS_API_VERSION):
     # easier to patch during unit tests
-    client = Client(
-        '%s/3.1' %
-        settings.MAILMAN_REST_API_URL,
-        settings.MAILMAN_REST_API_USER,
-        settings.MAILMAN_REST_API_PASS)
-    return client
+    return client_registry.get(api_version)
+
+
+def get_error_message(error):
+    """Return the message of an error from Core as text."""
+    msg = getattr(error, 'msg', None)
+    if isinstance(msg, bytes):
+        msg = msg.decode('utf-8', 'replace')
+    return msg or str(error)
+
+
+def concurrent_map(func, items, max_workers=None, return_exceptions=False):
+    """Call `func` on every item, running up to `max_workers` at once.
+
+    This is meant for independent REST calls to Core, which spend most of
+    their time waiting on the network.
+
+    :param func: Callable taking a single item.
+    :param items: Iterable of items.
+    :param max_workers: Maximum number of concurrent calls. Defaults to
+        ``POSTORIUS_REST_CONCURRENCY``.
+    :param return_exceptions: If True, exceptions are returned in place of
+        the results instead of being raised.
+    :return: The results, in the same order as `items`.
+    :rtype: list
+    """
+    items = list(items)
+    if max_workers is None:
+        max_workers = getattr(settings, 'POSTORIUS_REST_CONCURRENCY',
+                              DEFAULT_REST_CONCURRENCY)
+
+    def call(item):
+        try:
+            return func(item)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            return e
+
+    if max_workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+
+    request_cache = get_request_cache()
+
+    def call_in_thread(item):
+        # Share the caller's request cache with the worker thread.
+        _local.request_cache = request_cache
+        try:
+            return call(item)
+        finally:
+            _local.request_cache = None
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(call_in_thread, items))
 
 
 LANGUAGES = (
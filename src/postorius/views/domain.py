@@ -26,7 +26,7 @@ from django.utils.translation import gettext as _
 from django_mailman3.models import MailDomain
 from django.utils.six.moves.urllib.error import HTTPError
 from postorius.auth.decorators import superuser_required
-from postorius.models import Domain, Mailman404Error
+from postorius.models import Domain, List, Mailman404Error
 from postorius.forms import DomainEditForm, DomainForm
 
 
@@ -34,14 +34,11 @@ from postorius.forms import DomainEditForm, DomainForm
 @superuser_required
 def domain_index(request):
     existing_domains = Domain.objects.all()
+    sites = Domain.objects.get_sites(
+        [domain.mail_host for domain in existing_domains],
+        lambda: Site.objects.get_current(request))
     for domain in existing_domains:
-        try:
-            web_host = MailDomain.objects.get(mail_domain=domain.mail_host)
-        except MailDomain.DoesNotExist:
-            site = Site.objects.get_current(request)
-            web_host = MailDomain.objects.create(
-                site=site, mail_domain=domain.mail_host)
-        domain.site = web_host.site
+        domain.site = sites[domain.mail_host]
     return render(request, 'postorius/domain/index.html', {
                   'domains': existing_domains,
                   })
@@ -63,6 +60,7 @@ def domain_new(request):
             except HTTPError as e:
                 form.add_error('mail_host', e.reason)
             else:
+                Domain.objects.invalidate_cache()
                 messages.success(request, _("New Domain registered"))
                 MailDomain.objects.get_or_create(
                     site=form.cleaned_data['site'],
@@ -99,6 +97,7 @@ def domain_edit(request, domain):
                 messages.error(request, e)
             else:
                 messages.success(request, _("Domain %s updated") % domain)
+            Domain.objects.invalidate_cache()
             return redirect("domain_edit", domain=domain)
         else:
             messages.error(request, _('Please check the errors below'))
@@ -123,6 +122,8 @@ def domain_delete(request, domain):
     if request.method == 'POST':
         try:
             domain_obj.delete()
+            Domain.objects.invalidate_cache()
+            List.objects.forget_counts(domain)
             MailDomain.objects.filter(mail_domain=domain).delete()
             messages.success(request,
                              _('The domain %s has been deleted.' % domain))
@@ -19,10 +19,10 @@
 
 from django.http import HttpResponse
 from django.views.generic import TemplateView
-from django_mailman3.lib.mailman import get_mailman_client
 
 from postorius.models import List
 from postorius.auth.utils import set_list_access_props
+from postorius.utils import VIEWS_API_VERSION, get_mailman_client
 
 
 class MailmanClientMixin(object):
@@ -31,7 +31,7 @@ class MailmanClientMixin(object):
 
     def client(self):
         if getattr(self, '_client', None) is None:
-            self._client = get_mailman_client()
+            self._client = get_mailman_client(VIEWS_API_VERSION)
         return self._client
 
 
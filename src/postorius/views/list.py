@@ -18,11 +18,10 @@
 
 
 import csv
-import email.utils
 import logging
 
 from allauth.account.models import EmailAddress
-from django.http import HttpResponse, HttpResponseNotAllowed, Http404
+from django.http import HttpResponseNotAllowed, Http404, StreamingHttpResponse
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -30,10 +29,10 @@ from django.core.validators import validate_email
 from django.forms import formset_factory
 from django.shortcuts import render, redirect
 from django.core.exceptions import ValidationError
+from django.db.models import Count
 from django.urls import reverse
 from django.utils.decorators import method_decorator
-from django.utils.translation import gettext as _
-from django_mailman3.lib.mailman import get_mailman_client
+from django.utils.translation import gettext as _, ngettext
 from django_mailman3.lib.paginator import paginate, MailmanPaginator
 from django.utils.six.moves.urllib.error import HTTPError
 
@@ -43,11 +42,15 @@ from postorius.forms import (
     DigestSettingsForm, AlterMessagesForm, ListAutomaticResponsesForm,
     ListIdentityForm, ListMassSubscription, ListMassRemoval, ListAddBanForm,
     ListHeaderMatchForm, ListHeaderMatchFormset, MemberModeration,
-    DMARCMitigationsForm, ListAnonymousSubscribe)
-from postorius.models import Domain, List, Mailman404Error, Style
+    DMARCMitigationsForm, ListAnonymousSubscribe, HeldMessagesFilterForm)
+from postorius import jobs
+from postorius.models import (
+    Domain, List, Mailman404Error, Member, MembershipJob, MembershipJobResult,
+    MODERATION_ACTIONS, Style)
 from postorius.auth.decorators import (
     list_owner_required, list_moderator_required, superuser_required)
 from postorius.auth.mixins import ListOwnerMixin
+from postorius.utils import VIEWS_API_VERSION, get_mailman_client
 from postorius.views.generic import MailingListView
 
 
@@ -115,12 +118,9 @@ class ListMembersViews(ListOwnerMixin, MailingListView):
         """Handle POST for members. Unsubscribe all the members selected."""
         form = MultipleChoiceForm(request.POST)
         if form.is_valid():
-            members = form.cleaned_data['choices']
-            for member in members:
-                self.mailing_list.unsubscribe(member)
-            messages.success(
-                request,
-                _('The selected members have been unsubscribed'))
+            result = List.objects.bulk_unsubscribe(
+                self.mailing_list, form.cleaned_data['choices'])
+            _unsubscribe_summary(request, self.mailing_list, result)
         return redirect('list_members', self.mailing_list.list_id, role)
 
     def _non_member_post(self, request, role):
@@ -136,6 +136,8 @@ class ListMembersViews(ListOwnerMixin, MailingListView):
                     role=role,
                     address=member_form.cleaned_data['email'],
                     display_name=member_form.cleaned_data['display_name'])
+                Member.objects.invalidate_cache(
+                    member_form.cleaned_data['email'])
                 messages.success(
                     request,
                     _('%(email)s has been added with the role %(role)s'.format(
@@ -256,19 +258,14 @@ class ListSummaryView(MailingListView):
             user_emails = EmailAddress.objects.filter(
                 user=request.user, verified=True).order_by(
                 "email").values_list("email", flat=True)
-            pending_requests = [r['email'] for r in self.mailing_list.requests]
-            for address in user_emails:
-                if address in pending_requests:
-                    data['user_request_pending'] = True
-                    break
-                try:
-                    self.mailing_list.get_member(address)
-                except ValueError:
-                    pass
-                else:
-                    data['user_subscribed'] = True
-                    data['subscribed_address'] = address
-                    break  # no need to test more addresses
+            subscribed_address = List.objects.get_subscribed_address(
+                self.mailing_list, user_emails)
+            if subscribed_address is not None:
+                data['user_subscribed'] = True
+                data['subscribed_address'] = subscribed_address
+            elif List.objects.get_pending_address(
+                    self.mailing_list, user_emails) is not None:
+                data['user_request_pending'] = True
             data['subscribe_form'] = ListSubscribe(user_emails)
         else:
             user_emails = None
@@ -288,17 +285,12 @@ class ChangeSubscriptionView(MailingListView):
                 "email").values_list("email", flat=True)
             form = ListSubscribe(user_emails, request.POST)
             # Find the currently subscribed email
-            old_email = None
-            for address in user_emails:
-                try:
-                    self.mailing_list.get_member(address)
-                except ValueError:
-                    pass
-                else:
-                    old_email = address
-                    break  # no need to test more addresses
-            assert old_email is not None
-            if form.is_valid():
+            old_email = List.objects.get_subscribed_address(
+                self.mailing_list, user_emails)
+            if old_email is None:
+                messages.error(request,
+                               _('You are not subscribed to this list.'))
+            elif form.is_valid():
                 email = form.cleaned_data['email']
                 if old_email == email:
                     messages.error(request, _('You are already subscribed'))
@@ -308,6 +300,8 @@ class ChangeSubscriptionView(MailingListView):
                     # confirmation is needed.
                     response = self.mailing_list.subscribe(
                         email, pre_confirmed=True)
+                    Member.objects.invalidate_cache(old_email, email)
+                    List.objects.forget_requests(self.mailing_list.list_id)
                     if (type(response) == dict and                # noqa: W504
                             response.get('token_owner') == 'moderator'):
                         messages.success(
@@ -346,6 +340,8 @@ class ListSubscribeView(MailingListView):
                 email = request.POST.get('email')
                 response = self.mailing_list.subscribe(
                     email, pre_verified=True, pre_confirmed=True)
+                Member.objects.invalidate_cache(email)
+                List.objects.forget_requests(self.mailing_list.list_id)
                 if (type(response) == dict and                    # noqa: W504
                         response.get('token_owner') == 'moderator'):
                     messages.success(
@@ -382,6 +378,7 @@ class ListAnonymousSubscribeView(MailingListView):
                 email = form.cleaned_data.get('email')
                 self.mailing_list.subscribe(email, pre_verified=False,
                                             pre_confirmed=False)
+                List.objects.forget_requests(self.mailing_list.list_id)
                 messages.success(request, _('Please check your inbox for '
                                             'further instructions'))
             else:
@@ -401,6 +398,8 @@ class ListUnsubscribeView(MailingListView):
         email = request.POST['email']
         try:
             self.mailing_list.unsubscribe(email)
+            Member.objects.invalidate_cache(email)
+            List.objects.forget_requests(self.mailing_list.list_id)
             messages.success(request, _('%s has been unsubscribed'
                                         ' from this list.') % email)
         except ValueError as e:
@@ -415,30 +414,76 @@ def list_mass_subscribe(request, list_id):
     if request.method == 'POST':
         form = ListMassSubscription(request.POST)
         if form.is_valid():
-            for data in form.cleaned_data['emails']:
-                try:
-                    # Parse the data to get the address and the display name
-                    display_name, address = email.utils.parseaddr(data)
-                    validate_email(address)
-                    mailing_list.subscribe(address=address,
-                                           display_name=display_name,
-                                           pre_verified=True,
-                                           pre_confirmed=True,
-                                           pre_approved=True)
-                    messages.success(
-                        request, _('The address %(address)s has been'
-                                   ' subscribed to %(list)s.') %
-                        {'address': address,
-                         'list': mailing_list.fqdn_listname})
-                except HTTPError as e:
-                    messages.error(request, e)
-                except ValidationError:
-                    messages.error(request, _('The email address %s'
-                                              ' is not valid.') % address)
+            # Subscribing many addresses takes long, it is done by a job
+            # and the progress is shown on the job's page.
+            job = jobs.create_subscribe_job(
+                mailing_list, form.cleaned_data['emails'], request.user)
+            jobs.schedule_job(job)
+            return redirect('membership_job', mailing_list.list_id, job.pk)
     else:
         form = ListMassSubscription()
+    recent_jobs = MembershipJob.objects.filter(
+        list_id=mailing_list.list_id, action=MembershipJob.SUBSCRIBE)[:5]
     return render(request, 'postorius/lists/mass_subscribe.html',
-                  {'form': form, 'list': mailing_list})
+                  {'form': form, 'list': mailing_list,
+                   'recent_jobs': recent_jobs})
+
+
+@login_required
+@list_owner_required
+def membership_job(request, list_id, job_id):
+    mailing_list = List.objects.get_or_404(fqdn_listname=list_id)
+    try:
+        job = MembershipJob.objects.get(pk=job_id,
+                                        list_id=mailing_list.list_id)
+    except MembershipJob.DoesNotExist:
+        raise Http404('No such job')
+    results = job.results.all()
+    status_filter = request.GET.get('status')
+    if status_filter in dict(MembershipJobResult.STATUS_CHOICES):
+        results = results.filter(status=status_filter)
+    else:
+        status_filter = None
+    counts = dict(
+        job.results.values_list('status').annotate(Count('pk')))
+    return render(request, 'postorius/lists/membership_job.html', {
+        'list': mailing_list,
+        'job': job,
+        'status_filter': status_filter,
+        'success_count': counts.get(MembershipJobResult.SUCCESS, 0),
+        'error_count': counts.get(MembershipJobResult.ERROR, 0),
+        'pending_count': counts.get(MembershipJobResult.PENDING, 0),
+        'results': paginate(results, request.GET.get('page'),
+                            request.GET.get('count', 50)),
+        })
+
+
+def _summarize(items, limit=10):
+    summary = ', '.join(items[:limit])
+    if len(items) > limit:
+        summary += ' ' + _('and %d more') % (len(items) - limit)
+    return summary
+
+
+def _unsubscribe_summary(request, mailing_list, result):
+    """Show the outcome of a bulk unsubscription in a few messages."""
+    if result.unsubscribed:
+        messages.success(request, ngettext(
+            '%(count)d address has been unsubscribed from %(list)s.',
+            '%(count)d addresses have been unsubscribed from %(list)s.',
+            len(result.unsubscribed)) % {
+                'count': len(result.unsubscribed),
+                'list': mailing_list.fqdn_listname})
+    if result.not_members:
+        messages.warning(request, _('These addresses are not members of'
+                                    ' the list: %s') %
+                         _summarize(result.not_members))
+    if result.errors:
+        messages.error(request, _('These addresses could not be'
+                                  ' unsubscribed: %s') %
+                       _summarize([
+                           '{} ({})'.format(address, error)
+                           for address, error in result.errors.items()]))
 
 
 class ListMassRemovalView(MailingListView):
@@ -458,61 +503,98 @@ class ListMassRemovalView(MailingListView):
         if not form.is_valid():
             messages.error(request, _('Please fill out the form correctly.'))
         else:
+            addresses = []
+            invalid = []
             for address in form.cleaned_data['emails']:
                 try:
                     validate_email(address)
-                    self.mailing_list.unsubscribe(address.lower())
-                    messages.success(
-                        request, _('The address %(address)s has been'
-                                   ' unsubscribed from %(list)s.') %
-                        {'address': address,
-                         'list': self.mailing_list.fqdn_listname})
-                except (HTTPError, ValueError) as e:
-                    messages.error(request, e)
+                    addresses.append(address)
                 except ValidationError:
-                    messages.error(request, _('The email address %s'
-                                              ' is not valid.') % address)
+                    invalid.append(address)
+            if invalid:
+                messages.error(request, _('These email addresses are not'
+                                          ' valid: %s') %
+                               _summarize(invalid))
+            result = List.objects.bulk_unsubscribe(
+                self.mailing_list, addresses)
+            _unsubscribe_summary(request, self.mailing_list, result)
         return redirect('mass_removal', self.mailing_list.list_id)
 
 
-def _perform_action(message_ids, action):
-    for message_id in message_ids:
-        action(message_id)
+def _moderation_summary(request, action, result):
+    """Show the outcome of a bulk moderation in a few messages."""
+    if result.moderated:
+        count = len(result.moderated)
+        if action == 'accept':
+            message = ngettext('%(count)d message was accepted.',
+                               '%(count)d messages were accepted.', count)
+        elif action == 'reject':
+            message = ngettext('%(count)d message was rejected.',
+                               '%(count)d messages were rejected.', count)
+        else:
+            message = ngettext('%(count)d message was discarded.',
+                               '%(count)d messages were discarded.', count)
+        messages.success(request, message % {'count': count})
+    if result.errors:
+        messages.error(request, _('These messages could not be moderated:'
+                                  ' %s') % _summarize([
+                                      '{} ({})'.format(held_id, error)
+                                      for held_id, error
+                                      in result.errors.items()]))
 
 
 @login_required
 @list_moderator_required
 def list_moderation(request, list_id, held_id=-1):
     mailing_list = List.objects.get_or_404(fqdn_listname=list_id)
+    filter_form = HeldMessagesFilterForm(request.GET)
+    filters = filter_form.get_filters()
     if request.method == 'POST':
         form = MultipleChoiceForm(request.POST)
-        if form.is_valid():
-            message_ids = form.cleaned_data['choices']
-            try:
-                if 'accept' in request.POST:
-                    _perform_action(message_ids, mailing_list.accept_message)
-                    messages.success(request,
-                                     _('The selected messages were accepted'))
-                elif 'reject' in request.POST:
-                    _perform_action(message_ids, mailing_list.reject_message)
-                    messages.success(request,
-                                     _('The selected messages were rejected'))
-                elif 'discard' in request.POST:
-                    _perform_action(message_ids, mailing_list.discard_message)
-                    messages.success(request,
-                                     _('The selected messages were discarded'))
-            except HTTPError:
-                messages.error(request, _('Message could not be found'))
+        action = next((name for name in MODERATION_ACTIONS
+                       if name in request.POST), None)
+        if action is not None and 'all_matching' in request.POST:
+            # Apply to every held message matching the filters, not only
+            # those on the current page, once the moderator confirmed.
+            held_ids = List.objects.find_held_message_ids(
+                mailing_list, **filters)
+            if 'confirmed' not in request.POST:
+                return render(
+                    request, 'postorius/lists/confirm_moderate_all.html',
+                    {'list': mailing_list, 'action': action,
+                     'count': len(held_ids), 'filters': filters})
+            result = List.objects.bulk_moderate(
+                mailing_list, held_ids, action)
+            _moderation_summary(request, action, result)
+        elif action is not None and form.is_valid():
+            result = List.objects.bulk_moderate(
+                mailing_list, form.cleaned_data['choices'], action)
+            _moderation_summary(request, action, result)
     else:
         form = MultipleChoiceForm()
-    held_messages = paginate(
-        mailing_list.get_held_page,
-        request.GET.get('page'), request.GET.get('count'),
-        paginator_class=MailmanPaginator)
+    if filters:
+        # Only the messages of the current page are fetched, the ids of the
+        # matching ones are cached.
+        held_messages = paginate(
+            List.objects.find_held_message_ids(mailing_list, **filters),
+            request.GET.get('page'), request.GET.get('count'))
+        held_messages.object_list = List.objects.get_held_messages(
+            mailing_list, held_messages.object_list)
+    else:
+        held_messages = paginate(
+            mailing_list.get_held_page,
+            request.GET.get('page'), request.GET.get('count'),
+            paginator_class=MailmanPaginator)
+    # Only keep what the page shows, the full messages are loaded from
+    # rest_held_message when opened.
+    held_messages.object_list = List.objects.summarize_held_messages(
+        mailing_list.list_id, held_messages.object_list)
     context = {
         'list': mailing_list,
         'held_messages': held_messages,
         'form': form,
+        'filter_form': filter_form,
+        'filters': filters,
         }
     return render(request, 'postorius/lists/held_messages.html', context)
 
@@ -533,25 +615,78 @@ def moderate_held_message(request, list_id):
     elif 'discard' in request.POST:
         mailing_list.discard_message(msg_id)
         messages.success(request, _('The message was discarded'))
+    List.objects.forget_held_message(mailing_list.list_id, msg_id)
     return redirect('list_held_messages', list_id)
 
 
+# Columns which can be exported along with the members' addresses.
+CSV_EXPORT_FIELDS = (
+    'email', 'display_name', 'role', 'delivery_mode', 'moderation_action')
+
+# Number of members fetched from Core at a time by the CSV export, unless
+# overridden by the POSTORIUS_CSV_EXPORT_PAGE_SIZE setting.
+CSV_EXPORT_PAGE_SIZE = 500
+
+
+class _Echo(object):
+    """File-like object which returns what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def _iter_roster(mailing_list, role):
+    """Yield all the members of a list's roster, one page at a time."""
+    count = getattr(settings, 'POSTORIUS_CSV_EXPORT_PAGE_SIZE',
+                    CSV_EXPORT_PAGE_SIZE)
+    if role == 'member':
+        page = mailing_list.get_member_page(count=count, page=1)
+    else:
+        page = mailing_list.find_members(
+            '', role=role, count=count, page=1)
+    while True:
+        for member in page:
+            yield member
+        if page.has_next:
+            page = page.next
+        else:
+            break
+
+
 @login_required
 @list_owner_required
 def csv_view(request, list_id):
     """Export all the subscriber in csv
+
+    The export is streamed, so that it needs the same amount of memory for
+    any list size. The `role` parameter selects another roster than the
+    subscribers, and `fields` a comma separated list of columns from
+    `CSV_EXPORT_FIELDS`. A header row is added when more than the email
+    addresses are exported.
     """
     mm_lists = List.objects.get_or_404(fqdn_listname=list_id)
-
-    response = HttpResponse(content_type='text/csv')
+    role = request.GET.get('role', 'member')
+    if role not in ListMembersViews.allowed_roles:
+        raise Http404(_('No such role'))
+    fields = request.GET.get('fields', 'email').split(',')
+    if not set(fields) <= set(CSV_EXPORT_FIELDS):
+        raise Http404(_('No such field'))
+
+    def rows():
+        writer = csv.writer(_Echo())
+        if fields != ['email']:
+            yield writer.writerow(fields)
+        for member in _iter_roster(mm_lists, role):
+            yield writer.writerow(
+                [getattr(member, field, '') for field in fields])
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    if role == 'member':
+        filename = 'Subscribers.csv'
+    else:
+        filename = '{}s.csv'.format(role.capitalize())
     response['Content-Disposition'] = (
-        'attachment; filename="Subscribers.csv"')
-
-    writer = csv.writer(response)
-    if mm_lists:
-        for i in mm_lists.members:
-            writer.writerow([i.email])
-
+        'attachment; filename="{}"'.format(filename))
     return response
 
 
@@ -601,12 +736,16 @@ def list_new(request, template='postorius/lists/new.html'):
                     form.cleaned_data['listname'],
                     style_name=form.cleaned_data['list_style'])
                 mailing_list.add_owner(form.cleaned_data['list_owner'])
+                Member.objects.invalidate_cache(
+                    form.cleaned_data['list_owner'])
                 list_settings = mailing_list.settings
                 if form.cleaned_data['description']:
                     list_settings["description"] = \
                         form.cleaned_data['description']
                 list_settings["advertised"] = form.cleaned_data['advertised']
                 list_settings.save()
+                List.objects.invalidate_cache(mailing_list.list_id)
+                List.objects.forget_counts(domain.mail_host)
                 messages.success(request, _("List created"))
                 return redirect("list_summary",
                                 list_id=mailing_list.list_id)
@@ -649,7 +788,6 @@ def list_index_authenticated(request):
 
     """
     role = request.GET.get('role', None)
-    client = get_mailman_client()
     choosable_domains = _get_choosable_domains(request)
 
     # Get all the verified addresses of the user.
@@ -658,20 +796,14 @@ def list_index_authenticated(request):
             "email").values_list("email", flat=True)
 
     # Get all the mailing lists for the current user.
-    all_lists = []
-    for user_email in user_emails:
-        try:
-            all_lists.extend(client.find_lists(user_email, role=role))
-        except HTTPError:
-            # No lists exist with the given role for the given user.
-            pass
+    all_lists = List.objects.find_by_subscriber(user_emails, role=role)
     # If the user has no list that they are subscriber/owner/moderator of, we
     # just redirect them to the index page with all lists.
     if len(all_lists) == 0 and role is None:
         return redirect(reverse('list_index') + '?all-lists')
     # Render the list index page.
     context = {
-        'lists': _unique_lists(all_lists),
+        'lists': List.objects.prefetch_settings(_unique_lists(all_lists)),
         'domain_count': len(choosable_domains),
         'role': role
     }
@@ -694,7 +826,7 @@ def list_index(request, template='postorius/index.html'):
         return list_index_authenticated(request)
 
     def _get_list_page(count, page):
-        client = get_mailman_client()
+        client = get_mailman_client(VIEWS_API_VERSION)
         advertised = not request.user.is_superuser
         return client.get_list_page(
             advertised=advertised, count=count, page=page)
@@ -702,6 +834,7 @@ def list_index(request, template='postorius/index.html'):
     lists = paginate(
         _get_list_page, request.GET.get('page'), request.GET.get('count'),
         paginator_class=MailmanPaginator)
+    List.objects.prefetch_settings(lists)
 
     choosable_domains = _get_choosable_domains(request)
 
@@ -718,7 +851,11 @@ def list_delete(request, list_id):
     """
     the_list = List.objects.get_or_404(fqdn_listname=list_id)
     if request.method == 'POST':
+        # The list can't be fetched anymore once it is deleted.
+        list_id, mail_host = the_list.list_id, the_list.mail_host
         the_list.delete()
+        List.objects.invalidate_cache(list_id)
+        List.objects.forget_counts(mail_host)
         return redirect("list_index")
     else:
         submit_url = reverse('list_delete',
@@ -733,22 +870,60 @@ def list_delete(request, list_id):
 @list_moderator_required
 def list_subscription_requests(request, list_id):
     """Shows a list of subscription requests.
+
+    Selected requests can be accepted, rejected or discarded at once.
     """
     m_list = List.objects.get_or_404(fqdn_listname=list_id)
-    requests = [req
-                for req in m_list.requests
-                if req['token_owner'] == 'moderator']
+    if request.method == 'POST':
+        form = MultipleChoiceForm(request.POST)
+        action = next((name for name in MODERATION_ACTIONS
+                       if name in request.POST), None)
+        if action is not None and form.is_valid():
+            result = List.objects.bulk_moderate_requests(
+                m_list, form.cleaned_data['choices'], action)
+            _request_moderation_summary(request, action, result)
+            return redirect('list_subscription_requests', m_list.list_id)
+    else:
+        form = MultipleChoiceForm()
+
+    def find_method(count, page):
+        return List.objects.get_request_page(m_list, count=count, page=page)
+
     paginated_requests = paginate(
-        requests,
-        request.GET.get('page'),
-        request.GET.get('count', 25))
-    page_subtitle = '(%d)' % len(requests)
+        find_method,
+        request.GET.get('page', 1),
+        request.GET.get('count', 25),
+        paginator_class=MailmanPaginator)
+    page_subtitle = '(%d)' % paginated_requests.paginator.count
     return render(request, 'postorius/lists/subscription_requests.html',
                   {'list': m_list,
                    'paginated_requests': paginated_requests,
+                   'form': form,
                    'page_subtitle': page_subtitle})
 
 
+def _request_moderation_summary(request, action, result):
+    """Show the outcome of a bulk moderation of requests."""
+    if result.moderated:
+        count = len(result.moderated)
+        if action == 'accept':
+            message = ngettext('%(count)d request was accepted.',
+                               '%(count)d requests were accepted.', count)
+        elif action == 'reject':
+            message = ngettext('%(count)d request was rejected.',
+                               '%(count)d requests were rejected.', count)
+        else:
+            message = ngettext('%(count)d request was discarded.',
+                               '%(count)d requests were discarded.', count)
+        messages.success(request, message % {'count': count})
+    if result.errors:
+        messages.error(request, _('These requests could not be moderated:'
+                                  ' %s') % _summarize([
+                                      '{} ({})'.format(token, error)
+                                      for token, error
+                                      in result.errors.items()]))
+
+
 @login_required
 @list_moderator_required
 def handle_subscription_request(request, list_id, request_id, action):
@@ -770,6 +945,7 @@ def handle_subscription_request(request, list_id, request_id, action):
         m_list = List.objects.get_or_404(fqdn_listname=list_id)
         # Moderate request and add feedback message to session.
         m_list.moderate_request(request_id, action)
+        List.objects.forget_requests(m_list.list_id)
         messages.success(request, confirmation_messages[action])
     except HTTPError as e:
         if e.code == 409:
@@ -844,6 +1020,7 @@ def list_settings(request, list_id=None, visible_section=None,
                 messages.error(
                     request,
                     _('An error occured: ') + e.reason.decode('utf-8'))
+            List.objects.invalidate_cache(m_list.list_id)
             return redirect('list_settings', m_list.list_id, visible_section)
     else:
         form = form_class(initial=initial_data, mlist=m_list)
@@ -886,6 +1063,7 @@ def remove_role(request, list_id=None, role=None, address=None,
     if request.method == 'POST':
         try:
             the_list.remove_role(role, address)
+            Member.objects.invalidate_cache(address)
         except HTTPError as e:
             messages.error(request, _('The user could not be removed: %(msg)s')
                            % {'msg': e.msg.decode()})
@@ -906,23 +1084,19 @@ def remove_all_subscribers(request, list_id):
     """Empty the list by unsubscribing all members."""
 
     mlist = List.objects.get_or_404(fqdn_listname=list_id)
-    if len(mlist.members) == 0:
+    # Only fetch a single member to know whether the list is empty.
+    if mlist.get_member_page(count=1, page=1).total_size == 0:
         messages.error(request,
                        _('No member is subscribed to the list currently.'))
         return redirect('mass_removal', mlist.list_id)
     if request.method == 'POST':
-        try:
-            # TODO maxking: This doesn't scale. Either the Core should provide
-            # an endpoint to remove all subscribers or there should be some
-            # better way to do this. Maybe, Core can take a list of email
-            # addresses in batches of 50 and unsubscribe all of them.
-            for names in mlist.members:
-                mlist.unsubscribe(names.email)
-            messages.success(request, _('All members have been'
-                                        ' unsubscribed from the list.'))
-            return redirect('list_members', mlist.list_id, 'subscriber')
-        except Exception as e:
-            messages.error(request, e)
+        # Unsubscribing everyone takes long on large lists, it is done by a
+        # job and the progress is shown on the job's page.
+        job = jobs.create_unsubscribe_all_job(mlist, request.user)
+        jobs.schedule_job(job)
+        messages.success(request, _('The members of the list are being'
+                                    ' unsubscribed.'))
+        return redirect('membership_job', mlist.list_id, job.pk)
     return render(request,
                   'postorius/lists/confirm_removeall_subscribers.html',
                   {'list': mlist})
@@ -20,7 +20,6 @@ import json
 
 from email import policy
 from email import message_from_string
-from email.parser import HeaderParser
 
 from django.http import HttpResponse, Http404
 from django.contrib.auth.decorators import login_required
@@ -33,23 +32,60 @@ from django_mailman3.lib.scrub import Scrubber
 
 
 def parse(message):
-    msgobj = message_from_string(message, policy=policy.SMTP)
-    header_parser = HeaderParser()
+    """Parse and scrub a raw message.
 
+    :return: The scrubbed body, the headers and the attachments as
+        ``(counter, name, content_type, encoding, content)`` tuples.
+    :rtype: dict
+    """
+    msgobj = message_from_string(message, policy=policy.SMTP)
     headers = []
-    headers_dict = header_parser.parsestr(message)
-    for key in headers_dict.keys():
-        headers.append('{}: {}'.format(key, headers_dict[key]))
-    content = Scrubber(msgobj).scrub()[0]
+    for key, value in msgobj.raw_items():
+        headers.append('{}: {}'.format(key, value))
+    content, attachments = Scrubber(msgobj).scrub()
     return {
         'body': content,
         'headers': '\n'.join(headers),
+        'attachments': attachments,
     }
 
 
 def get_attachments(message):
-    message = message_from_string(message, policy=policy.SMTP)
-    return Scrubber(message).scrub()[1]
+    return parse(message)['attachments']
+
+
+def render_held_message(mailing_list, held_id):
+    """Return a held message with its parsed content.
+
+    The message is fetched, parsed and scrubbed once, then served from the
+    cache until it is moderated.
+
+    :param mailing_list: The list the message is held for.
+    :type mailing_list: mailmanclient.MailingList
+    :param held_id: The request id of the held message.
+    :rtype: dict
+    """
+    rendered = List.objects.get_cached_held_message(
+        mailing_list.list_id, held_id)
+    if rendered is None:
+        held_message = mailing_list.get_held_message(held_id)
+        parsed = parse(held_message.msg)
+        rendered = {
+            'sender': held_message.sender,
+            'subject': held_message.subject,
+            'reason': held_message.reason,
+            'hold_date': held_message.hold_date,
+            'msgid': held_message.request_id,
+            'raw': held_message.msg,
+            'msg': {'body': parsed['body'], 'headers': parsed['headers']},
+            'attachments': dict(
+                (counter, (name, content_type, content))
+                for counter, name, content_type, encoding, content
+                in parsed['attachments']),
+        }
+        List.objects.cache_held_message(
+            mailing_list.list_id, held_id, rendered)
+    return rendered
 
 
 @login_required
@@ -60,21 +96,16 @@ def get_held_message(request, list_id, held_id=-1):
     if held_id == -1:
         raise Http404(_('Message does not exist'))
 
-    held_message = List.objects.get_or_404(
-        fqdn_listname=list_id).get_held_message(held_id)
+    held_message = render_held_message(
+        List.objects.get_or_404(fqdn_listname=list_id), held_id)
     if 'raw' in request.GET:
-        return HttpResponse(held_message.msg, content_type='text/plain')
+        return HttpResponse(held_message['raw'], content_type='text/plain')
     response_data = dict()
-    response_data['sender'] = held_message.sender
-    response_data['subject'] = held_message.subject
-    response_data['reason'] = held_message.reason
-    response_data['hold_date'] = held_message.hold_date
-    response_data['msg'] = parse(held_message.msg)
-    response_data['msgid'] = held_message.request_id
+    for key in ('sender', 'subject', 'reason', 'hold_date', 'msg', 'msgid'):
+        response_data[key] = held_message[key]
     response_data['attachments'] = []
-    attachments = get_attachments(held_message.msg)
-    for attachment in attachments:
-        counter, name, content_type, encoding, content = attachment
+    for counter in sorted(held_message['attachments']):
+        name = held_message['attachments'][counter][0]
         response_data['attachments'].append(
             (reverse('rest_attachment_for_held_message',
                      args=(list_id, held_id, counter)), name))
@@ -86,13 +117,14 @@ def get_held_message(request, list_id, held_id=-1):
 @login_required
 @list_moderator_required
 def get_attachment_for_held_message(request, list_id, held_id, attachment_id):
-    held_message = List.objects.get_or_404(
-        fqdn_listname=list_id).get_held_message(held_id)
-    attachments = get_attachments(held_message.msg)
-    for attachment in attachments:
-        if attachment[0] == int(attachment_id):
-            response = HttpResponse(attachment[4], content_type=attachment[2])
-            response['Content-Disposition'] = \
-                'attachment;filename="{}"'.format(attachment[1])
-            return response
-    raise Http404(_('Attachment does not exist'))
+    held_message = render_held_message(
+        List.objects.get_or_404(fqdn_listname=list_id), held_id)
+    try:
+        name, content_type, content = held_message['attachments'][
+            int(attachment_id)]
+    except KeyError:
+        raise Http404(_('Attachment does not exist'))
+    response = HttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = \
+        'attachment;filename="{}"'.format(name)
+    return response
@@ -18,9 +18,9 @@
 
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
-from django_mailman3.lib.mailman import get_mailman_client
 
 from postorius.auth.decorators import superuser_required
+from postorius.utils import VIEWS_API_VERSION, get_mailman_client
 
 
 SYSTEM_INFO_KEYS = (
@@ -33,7 +33,7 @@ SYSTEM_INFO_KEYS = (
 @login_required
 @superuser_required
 def system_information(request):
-    client = get_mailman_client()
+    client = get_mailman_client(VIEWS_API_VERSION)
     all_configs = client.system
 
     configs = []
@@ -17,12 +17,16 @@
 # Postorius.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+from calendar import timegm
+
 from django.core.exceptions import MultipleObjectsReturned
 from django.db import IntegrityError
 from django.conf import settings
 from django.http import Http404, HttpResponseBadRequest, HttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.views.decorators.http import require_safe
 from django.views.generic import (
     CreateView, UpdateView, ListView, DeleteView)
@@ -31,6 +35,10 @@ from postorius.models import Domain, EmailTemplate, List
 from postorius.auth.mixins import DomainOwnerMixin, ListOwnerMixin
 
 
+# Seconds during which Core may use a template without revalidating it.
+DEFAULT_TEMPLATE_MAX_AGE = 60
+
+
 class ListContextMixin:
 
     def get_context_data(self, *args, **kwargs):
@@ -182,17 +190,28 @@ def get_template_data(request, context, identifier, name):
     if context not in ('list', 'domain'):
         return HttpResponseBadRequest(
             'context should be either "list" or "domain"')
-    data = dict(name=name, identifier=identifier, context=context)
-    # Depending on the context, populate the right identifier.
     try:
-        template = EmailTemplate.objects.get(**data)
+        template = EmailTemplate.objects.get_served(context, identifier, name)
     except EmailTemplate.DoesNotExist:
         raise Http404('Template is not defined.')
     except MultipleObjectsReturned:
-        raise HttpResponseBadRequest('Multiple Templates exist')
-
-    content_type = 'text/plain'
-    if settings.DEFAULT_CHARSET:
-        content_type += '; charset=' + settings.DEFAULT_CHARSET
-    return HttpResponse(template.data,
-                        content_type=content_type)
+        return HttpResponseBadRequest('Multiple Templates exist')
+
+    # Core fetches the templates whenever it sends an email, let it
+    # revalidate its copy instead of downloading it again.
+    etag = quote_etag(template['etag'])
+    last_modified = timegm(template['modified_at'].utctimetuple())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type = 'text/plain'
+        if settings.DEFAULT_CHARSET:
+            content_type += '; charset=' + settings.DEFAULT_CHARSET
+        response = HttpResponse(template['data'], content_type=content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(
+        response, private=True,
+        max_age=getattr(settings, 'POSTORIUS_TEMPLATE_MAX_AGE',
+                        DEFAULT_TEMPLATE_MAX_AGE))
+    return response
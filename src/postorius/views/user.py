@@ -18,6 +18,7 @@
 
 
 import logging
+from collections.abc import Mapping
 from django.utils.six.moves.urllib.error import HTTPError
 
 from allauth.account.models import EmailAddress
@@ -35,12 +36,155 @@ from postorius.models import List, MailmanUser
 from postorius.forms import (
     UserPreferences, UserPreferencesFormset, ChangeSubscriptionForm)
 from postorius.views.generic import MailmanClientMixin
-from django_mailman3.lib.mailman import get_mailman_client
+from postorius.utils import (
+    VIEWS_API_VERSION, concurrent_map, get_mailman_client)
 
 
 logger = logging.getLogger(__name__)
 
 
+def load_preferences(resources):
+    """Fetch the preferences of users, addresses or members concurrently.
+
+    :param resources: Objects with a ``preferences`` attribute.
+    :return: The loaded preferences, in the same order.
+    :rtype: list of mailmanclient.Preferences
+    """
+    def load(resource):
+        preferences = resource.preferences
+        # Preferences are fetched on first access.
+        list(preferences)
+        return preferences
+    return concurrent_map(load, resources)
+
+
+class PreferencesResolver(object):
+    """Merge the layers of a user's preferences the way Core applies them.
+
+    From the lowest to the highest priority: the system defaults, the user's
+    global preferences, the address' preferences and the subscription's
+    preferences. Each layer is fetched at most once, so a resolver should be
+    built once per request and used for all the preferences shown. The
+    system defaults are served from the shared cache.
+    """
+
+    def __init__(self, mm_user):
+        self.mm_user = mm_user
+        self._defaults = None
+        self._global = None
+
+    @staticmethod
+    def _layer(preferences):
+        # self_link identifies the resource, it isn't a preference.
+        return dict((key, preferences[key]) for key in preferences
+                    if key != 'self_link')
+
+    @property
+    def defaults(self):
+        if self._defaults is None:
+            client = get_mailman_client(VIEWS_API_VERSION)
+            self._defaults = self._layer(client.preferences)
+        return self._defaults
+
+    @property
+    def global_preferences(self):
+        if self._global is None:
+            self._global = self._layer(self.mm_user.preferences)
+        return self._global
+
+    def resolve(self, *layers):
+        """Return the defaults and global preferences, overridden by the
+        given layers of preferences in order.
+
+        :rtype: dict
+        """
+        combined = dict(self.defaults)
+        combined.update(self.global_preferences)
+        for layer in layers:
+            combined.update(self._layer(layer))
+        return combined
+
+    def for_address(self, address):
+        return self.resolve(address.preferences)
+
+    def for_subscription(self, subscription, address_preferences=None):
+        layers = [subscription.preferences]
+        if address_preferences is not None:
+            layers.insert(0, address_preferences)
+        return self.resolve(*layers)
+
+    def for_subscriptions(self, subscriptions):
+        """Resolve the preferences of several subscriptions at once.
+
+        The preferences of the subscriptions, of their addresses and of the
+        user are fetched concurrently, with a single call for each of them.
+
+        :param subscriptions: The user's subscriptions.
+        :type subscriptions: list of mailmanclient.Member
+        :rtype: list of dict
+        """
+        subscriptions = list(subscriptions)
+        emails = set(sub.email for sub in subscriptions)
+        addresses = [address for address in self.mm_user.addresses
+                     if address.email in emails]
+        load_preferences(subscriptions + addresses + [self.mm_user])
+        address_preferences = dict(
+            (address.email, address.preferences) for address in addresses)
+        return [self.for_subscription(sub, address_preferences.get(sub.email))
+                for sub in subscriptions]
+
+
+class MergedPreferences(Mapping):
+    """The effective values of a layer of preferences, for display.
+
+    Reading gives the merged values, including the ones inherited from the
+    lower layers. Only the keys set to a different value are written to the
+    underlying preferences, and only when saving, so showing the preferences
+    never writes to Core.
+
+    :param preferences: The layer of preferences to change.
+    :type preferences: mailmanclient.Preferences
+    :param merged: The effective values, see `PreferencesResolver`.
+    :type merged: dict
+    """
+
+    def __init__(self, preferences, merged):
+        self._preferences = preferences
+        self._merged = merged
+        self._changed = {}
+
+    def __getitem__(self, key):
+        if key in self._changed:
+            return self._changed[key]
+        return self._merged[key]
+
+    def __iter__(self):
+        return iter(self._merged)
+
+    def __len__(self):
+        return len(self._merged)
+
+    def __setitem__(self, key, value):
+        if key in self._merged and self._merged[key] == value:
+            self._changed.pop(key, None)
+        else:
+            self._changed[key] = value
+
+    @property
+    def changed(self):
+        return dict(self._changed)
+
+    def save(self):
+        """Write the changed keys, if any, in a single request."""
+        if not self._changed:
+            return
+        for key, value in self._changed.items():
+            self._preferences[key] = value
+        self._preferences.save()
+        self._merged.update(self._changed)
+        self._changed = {}
+
+
 class UserPreferencesView(FormView, MailmanClientMixin):
     """Generic view for the logged-in user's various preferences."""
 
@@ -87,35 +231,12 @@ class UserMailmanSettingsView(UserPreferencesView):
     success_url = reverse_lazy('user_mailmansettings')
 
     def _get_preferences(self):
-        # Get the defaults and pre-populate so view shows them
-        combinedpreferences = self._get_combined_preferences()
-        for key in combinedpreferences:
-            if key != "self_link":
-                self.mm_user.preferences[key] = combinedpreferences[key]
-
-        # This is a bit of a hack so preferences behave as users expect
-        # We probably don't want to save, only display here
-        # but this means that whatever preferences the users see first are
-        # the ones they have unless they explicitly change them
-        self.mm_user.preferences.save()
-
-        return self.mm_user.preferences
+        # Show the inherited defaults, but only save what the user changes.
+        return MergedPreferences(self.mm_user.preferences,
+                                 self._get_combined_preferences())
 
     def _get_combined_preferences(self):
-        # Get layers of default preferences to match how they are applied
-        # We ignore self_link as we don't want to over-write it
-        defaultpreferences = get_mailman_client().preferences
-        combinedpreferences = {}
-        for key in defaultpreferences:
-            if key != "self_link":
-                combinedpreferences[key] = defaultpreferences[key]
-
-        # Clobber defaults with any preferences already set
-        for key in self.mm_user.preferences:
-            if key != "self_link":
-                combinedpreferences[key] = self.mm_user.preferences[key]
-
-        return(combinedpreferences)
+        return PreferencesResolver(self.mm_user).resolve()
 
 
 class UserAddressPreferencesView(UserPreferencesView):
@@ -124,56 +245,32 @@ class UserAddressPreferencesView(UserPreferencesView):
     template_name = 'postorius/user/address_preferences.html'
     success_url = reverse_lazy('user_address_preferences')
 
+    def _set_view_attributes(self, request, *args, **kwargs):
+        super(UserAddressPreferencesView, self)._set_view_attributes(
+            request, *args, **kwargs)
+        self.addresses = list(self.mm_user.addresses)
+
     def get_form_class(self):
         return formset_factory(
             UserPreferences, formset=UserPreferencesFormset, extra=0)
 
     def _get_preferences(self):
-        return [address.preferences for address in self.mm_user.addresses]
+        # Show the inherited values, but only save what the user changes.
+        return [MergedPreferences(address.preferences, merged)
+                for address, merged in zip(
+                    self.addresses, self._get_combined_preferences())]
 
     def _get_combined_preferences(self):
-        # grab the default preferences
-        defaultpreferences = get_mailman_client().preferences
-
-        # grab your global preferences
-        globalpreferences = self.mm_user.preferences
-
-        # start a new combined preferences object
-        combinedpreferences = []
-
-        for address in self.mm_user.addresses:
-            # make a per-address prefs object
-            prefs = {}
-
-            # initialize with default preferences
-            for key in defaultpreferences:
-                if key != "self_link":
-                    prefs[key] = defaultpreferences[key]
-
-            # overwrite with user's global preferences
-            for key in globalpreferences:
-                if key != "self_link":
-                    prefs[key] = globalpreferences[key]
-
-            # overwrite with address-specific preferences
-            for key in address.preferences:
-                if key != "self_link":
-                    prefs[key] = address.preferences[key]
-            combinedpreferences.append(prefs)
-
-            # put the combined preferences back on the original object
-            for key in prefs:
-                if key != "self_link":
-                    address.preferences[key] = prefs[key]
-
-        return combinedpreferences
+        load_preferences(self.addresses + [self.mm_user])
+        resolver = PreferencesResolver(self.mm_user)
+        return [resolver.for_address(address) for address in self.addresses]
 
     def get_context_data(self, **kwargs):
         data = super(UserAddressPreferencesView, self).get_context_data(
             **kwargs)
         data['formset'] = data.pop('form')
         for form, address in list(zip(
-                data['formset'].forms, self.mm_user.addresses)):
+                data['formset'].forms, self.addresses)):
             form.address = address
         return data
 
@@ -242,53 +339,16 @@ class UserSubscriptionPreferencesView(UserPreferencesView):
             UserPreferences, formset=UserPreferencesFormset, extra=0)
 
     def _get_preferences(self):
-        return [sub.preferences for sub in self.subscriptions]
+        # Only show what is set on the subscriptions, inherited values would
+        # look as if they were. Resolving the preferences fetches every layer
+        # concurrently, once.
+        self._get_combined_preferences()
+        return [subscription.preferences
+                for subscription in self.subscriptions]
 
     def _get_combined_preferences(self):
-        # grab the default preferences
-        defaultpreferences = get_mailman_client().preferences
-
-        # grab your global preferences
-        globalpreferences = self.mm_user.preferences
-
-        # start a new combined preferences object
-        combinedpreferences = []
-
-        for sub in self.subscriptions:
-            # make a per-address prefs object
-            prefs = {}
-
-            # initialize with default preferences
-            for key in defaultpreferences:
-                if key != "self_link":
-                    prefs[key] = defaultpreferences[key]
-
-            # overwrite with user's global preferences
-            for key in globalpreferences:
-                if key != "self_link":
-                    prefs[key] = globalpreferences[key]
-
-            # overwrite with address-based preferences
-            # There is currently no better way to do this,
-            # we may consider revisiting.
-            addresspreferences = {}
-            for address in self.mm_user.addresses:
-                if sub.email == address.email:
-                    addresspreferences = address.preferences
-
-            for key in addresspreferences:
-                if key != "self_link":
-                    prefs[key] = addresspreferences[key]
-
-            # overwrite with subscription-specific preferences
-            for key in sub.preferences:
-                if key != "self_link":
-                    prefs[key] = sub.preferences[key]
-
-            combinedpreferences.append(prefs)
-
-        return combinedpreferences
-        # return [sub.preferences for sub in self.subscriptions]
+        return PreferencesResolver(self.mm_user).for_subscriptions(
+            self.subscriptions)
 
     def get_context_data(self, **kwargs):
         data = super(UserSubscriptionPreferencesView, self).get_context_data(